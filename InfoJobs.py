@@ -1,13 +1,46 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, quote_plus
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    SelectolaxHTMLParser = None
+try:
+    from lxml import etree as lxml_etree, html as lxml_html
+except ImportError:
+    lxml_etree = lxml_html = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+from urllib.parse import urljoin, quote_plus, urlparse
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import time
 import sqlite3
+import threading
+import heapq
 import logging
 import re 
 import os 
 from datetime import datetime
 import html 
+import hashlib
+import argparse
+import socket
+import contextvars
+import json
+import zlib
+import contextlib
+import sys
+import random
+import unicodedata
+import csv
+import statistics
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import google.genai as genai 
 from google.genai import Client
 
@@ -15,18 +48,76 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 DB_VAGAS_NOME = "vagasINFO.db"
 DB_CLIENTES_NOME = "clientes.db"
+DB_RESPOSTAS_NOME = "respostasINFO.db"
+DB_ARQUIVO_NOME = "vagasINFO_arquivo.db"
+CACHE_RESPOSTAS_MAX_MB = 50 
+CACHE_RESPOSTAS_MAX_IDADE = 7 * 24 * 3600 
 URL_BASE = "https://www.infojobs.com.br"
 URL_TEMPLATE = URL_BASE + "/empregos.aspx?palabra="
+URL_PAGINA = "&page="
+MAX_PAGINAS_BUSCA = 10 
+INTERVALO_MINIMO_TERMO = 30 
+INTERVALO_MAXIMO_TERMO = 3600 
+NOVAS_VAGAS_POR_POLL = 0.5 
+JANELA_HISTORICO_DIAS = 14 
+ORCAMENTO_REQUISICOES_POR_MINUTO = 120 
+NUM_SHARDS = 64 
+LEASE_TTL = 60 
+LEASE_RENOVACAO = 20 
+LEASE_NOTIFICADOR = -1 
 TEMPO_ESPERA = 30 
 VAGAS_LIMITE_POPULACAO = 10 
 RETRY_DELAY = 2 
 MAX_RETRIES = 3 
+MAX_CONCORRENCIA = 8
+REQUISICOES_POR_SEGUNDO = 1.0
+RAJADA_REQUISICOES = 3
+TTL_CACHE_VAGA = 6 * 3600 
+RETENCAO_DESCRICAO_DIAS = 30 
+RETENCAO_HISTORICO_DIAS = 180 
+RETENCAO_INTERVALO = 6 * 3600 
+RETENCAO_LOTE = 500 
+NORMALIZACAO_LOTE = 1000 
+AGREGADOS_JANELA_DIAS = 30 
+AGREGADOS_INTERVALO = 3600 
+EXPORTACAO_LOTE = 5000 
+SIMHASH_DISTANCIA_MAXIMA = 5 
+SIMHASH_BANDAS = 6 
+RELEVANCIA_LIMIAR = 1.0 
+RELEVANCIA_PESO_TITULO = 2.0 
+DISJUNTOR_PAUSA_BASE = 5 
+DISJUNTOR_PAUSA_MAXIMA = 600 
+DISJUNTOR_LIMITE_FALHAS = 5 
+DISJUNTOR_FATOR_REDUCAO = 0.5 
+DISJUNTOR_TAXA_MINIMA = 0.05 
+DISJUNTOR_PASSO_RECUPERACAO = 0.1 
+STATUS_BLOQUEIO = (403, 429, 503)
+PADRAO_CAPTCHA = re.compile(r'captcha|cf-challenge|challenge-platform|acesso negado|access denied', re.IGNORECASE)
+IA_MAX_CONCORRENCIA = 2 
+IA_TAMANHO_LOTE = 5 
+IA_JANELA_LOTE = 1.0 
+GEMINI_FAKE = False 
+BACKEND_PARSER = "auto" 
+METRICAS_PORTA = 9108 
+PERFIL_INTERVALO = 0.01 
 
 TELEGRAM_TOKEN = "YOUR_TOKEN"
 TELEGRAM_CHAT_ID = "YOUR_CHAT_ID"
+TELEGRAM_API_BASE = "https://api.telegram.org"
+TELEGRAM_MAX_LEN = 4096
+TELEGRAM_JANELA_DIGEST = 10 
+TELEGRAM_MENSAGENS_POR_SEGUNDO = 30 
+TELEGRAM_MENSAGENS_POR_SEGUNDO_CHAT = 1 
+TELEGRAM_MENSAGENS_POR_MINUTO_CHAT = 20 
+TELEGRAM_MAX_TENTATIVAS = 10 
+SEPARADOR_DIGEST = "\n\n➖➖➖➖➖\n\n"
 
 API_KEY = "YOUR_GEMINI_API_KEY"
 gemini_client = None 
+repositorio = None 
+cache_respostas = None 
+notificador = None 
+perfis_relevancia = {} 
 
 prompt_sistema = (
     "Você é um assistente de recrutamento e analista de QA. Sua tarefa é analisar a descrição de uma vaga de emprego "
@@ -36,6 +127,12 @@ prompt_sistema = (
     
     "A saída deve ser texto simples (RAW TEXT). Não use caracteres de formatação Markdown como * (asterisco), ** (negrito) ou # (cabeçalho). CADA TÓPICO DEVE SER SEPARADO POR DUAS QUEBRAS DE LINHA (\n\n)."
 )
+prompt_lote = (
+    "Você receberá várias vagas de uma só vez. Cada vaga começa com uma linha no formato '### VAGA N'. "
+    "Resuma cada vaga de forma independente, seguindo as mesmas regras acima, e inicie o resumo de cada uma "
+    "com a mesma linha '### VAGA N' da vaga correspondente. Não omita nenhuma vaga."
+)
+MARCADOR_VAGA_LOTE = re.compile(r'^\s*#{3}\s*VAGA\s+(\d+)\s*$', re.MULTILINE)
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -44,6 +141,213 @@ HEADERS = {
     'Referer': 'https://www.google.com/',
     'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
 }
+HEADERS_BUSCA = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36', 
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
+    'Referer': 'https://www.google.com/',
+    'Accept-Language': 'pt-BR,pt;q=0.9',
+}
+HEADERS_DETALHE = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
+}
+
+ETAPAS_CICLO = ('espera', 'fetch', 'parse', 'db', 'ia', 'notify')
+CONTADORES_TERMO = (
+    'links_encontrados', 'vagas_novas', 'retries', 'falhas_parse', 'paginas_inalteradas', 'bloqueios', 'duplicatas',
+    'abaixo_do_limiar', 'cards_incompletos',
+)
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class CicloMetricas:
+    """
+    Tempos e contadores acumulados durante um único ciclo de um termo.
+    Etapas que rodam em paralelo (ex.: vários fetches de detalhe) somam o tempo de cada tarefa.
+    """
+
+    def __init__(self, search_term):
+        self.search_term = search_term
+        self.inicio = time.perf_counter()
+        self.tempos = dict.fromkeys(ETAPAS_CICLO, 0.0)
+        self.contadores = dict.fromkeys(CONTADORES_TERMO, 0)
+
+    def resumo(self):
+        tempos = ' '.join(f"{etapa}={segundos:.2f}s" for etapa, segundos in self.tempos.items())
+        contadores = ' '.join(f"{nome}={total}" for nome, total in self.contadores.items())
+        return f" [MÉTRICAS] Ciclo '{self.search_term}' em {time.perf_counter() - self.inicio:.2f}s | {tempos} | {contadores}"
+
+class Metricas:
+    """
+    Camada de métricas do bot.
+    - Histogramas de tempo por etapa (espera, fetch, parse, db, ia, notify e o ciclo inteiro).
+    - Contadores por termo: links encontrados, vagas novas, retries e falhas de parsing.
+    - O ciclo em andamento fica em um ContextVar, então tarefas e threads disparadas pelo ciclo
+      somam no resumo do termo certo sem precisar receber o termo como parâmetro.
+    - exporta_prometheus() gera o texto servido em /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ciclo_atual = contextvars.ContextVar('ciclo_metricas', default=None)
+        self.histogramas = {}
+        self.contadores = {}
+
+    @contextlib.contextmanager
+    def cronometro(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registra_tempo(etapa, time.perf_counter() - inicio)
+
+    def registra_tempo(self, etapa, segundos):
+        with self._lock:
+            histograma = self.histogramas.setdefault(etapa, [[0] * len(BUCKETS_SEGUNDOS), 0.0, 0])
+            for indice, limite in enumerate(BUCKETS_SEGUNDOS):
+                if segundos <= limite:
+                    histograma[0][indice] += 1
+            histograma[1] += segundos
+            histograma[2] += 1
+        ciclo = self._ciclo_atual.get()
+        if ciclo is not None and etapa in ciclo.tempos:
+            ciclo.tempos[etapa] += segundos
+
+    def incrementa(self, nome, quantidade=1, search_term=None):
+        """Soma `quantidade` ao contador `nome` do termo informado (ou do termo do ciclo em andamento)."""
+        ciclo = self._ciclo_atual.get()
+        if search_term is None:
+            search_term = ciclo.search_term if ciclo is not None else ''
+        with self._lock:
+            chave = (nome, search_term)
+            self.contadores[chave] = self.contadores.get(chave, 0) + quantidade
+        if ciclo is not None and nome in ciclo.contadores:
+            ciclo.contadores[nome] += quantidade
+
+    def inicia_ciclo(self, search_term):
+        with self._lock:
+            for nome in CONTADORES_TERMO:
+                self.contadores.setdefault((nome, search_term), 0)
+        ciclo = CicloMetricas(search_term)
+        return ciclo, self._ciclo_atual.set(ciclo)
+
+    def encerra_ciclo(self, inicio_ciclo):
+        ciclo, token = inicio_ciclo
+        self._ciclo_atual.reset(token)
+        self.registra_tempo('ciclo', time.perf_counter() - ciclo.inicio)
+        self.incrementa('ciclos', search_term=ciclo.search_term)
+        logging.info(ciclo.resumo())
+        return ciclo
+
+    def desvincula_ciclo(self):
+        """Tarefas de fundo (lotes da IA, fila do Telegram) não devem somar no ciclo que as criou."""
+        self._ciclo_atual.set(None)
+
+    def exporta_prometheus(self):
+        """Texto no formato de exposição do Prometheus (version 0.0.4)."""
+        def rotulo(valor):
+            return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        linhas = [
+            "# HELP infojobs_etapa_segundos Tempo gasto em cada etapa do ciclo de scraping.",
+            "# TYPE infojobs_etapa_segundos histogram",
+        ]
+        with self._lock:
+            for etapa, (buckets, soma, total) in sorted(self.histogramas.items()):
+                for limite, quantidade in zip(BUCKETS_SEGUNDOS, buckets):
+                    linhas.append(f'infojobs_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {quantidade}')
+                linhas.append(f'infojobs_etapa_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {total}')
+                linhas.append(f'infojobs_etapa_segundos_sum{{etapa="{etapa}"}} {soma:.6f}')
+                linhas.append(f'infojobs_etapa_segundos_count{{etapa="{etapa}"}} {total}')
+
+            nomes = sorted({nome for nome, _ in self.contadores})
+            for nome in nomes:
+                linhas.append(f"# TYPE infojobs_{nome}_total counter")
+                for (contador, search_term), total in sorted(self.contadores.items()):
+                    if contador == nome:
+                        linhas.append(f'infojobs_{nome}_total{{termo="{rotulo(search_term)}"}} {total}')
+        return "\n".join(linhas) + "\n"
+
+def cronometrado(etapa):
+    """Decorador: mede o tempo de cada chamada da função na etapa indicada."""
+    def decorador(func):
+        @functools.wraps(func)
+        def medido(*args, **kwargs):
+            with metricas.cronometro(etapa):
+                return func(*args, **kwargs)
+        return medido
+    return decorador
+
+def inicia_servidor_metricas(porta=METRICAS_PORTA, endereco='127.0.0.1'):
+    """Sobe o endpoint HTTP /metrics em uma thread daemon. Retorna o servidor, ou None se a porta estiver ocupada."""
+    class HandlerMetricas(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            corpo = metricas.exporta_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    try:
+        servidor = ThreadingHTTPServer((endereco, porta), HandlerMetricas)
+    except OSError as e:
+        logging.warning(f" [MÉTRICAS] Não foi possível abrir o endpoint /metrics na porta {porta}: {e}")
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+    logging.info(f" [MÉTRICAS] Endpoint disponível em http://{endereco}:{servidor.server_port}/metrics")
+    return servidor
+
+class AmostradorPerfil:
+    """
+    Profiler por amostragem (opcional): a cada `intervalo` segundos captura a pilha de todas as
+    threads e, ao parar, grava as pilhas agregadas no formato 'collapsed' (uma linha por pilha,
+    com a contagem no fim), pronto para flamegraph.pl ou speedscope.
+    """
+
+    def __init__(self, caminho, intervalo=PERFIL_INTERVALO):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.amostras = {}
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostra, name='perfil', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def _amostra(self):
+        proprio = threading.get_ident()
+        nomes = {}
+        while not self._parar.wait(self.intervalo):
+            for thread in threading.enumerate():
+                nomes[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pilha.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    frame = frame.f_back
+                chave = ';'.join([nomes.get(ident, str(ident))] + pilha[::-1])
+                self.amostras[chave] = self.amostras.get(chave, 0) + 1
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        with open(self.caminho, 'w', encoding='utf-8') as arquivo:
+            for pilha, total in sorted(self.amostras.items(), key=lambda item: -item[1]):
+                arquivo.write(f"{pilha} {total}\n")
+        logging.info(f" [PERFIL] {sum(self.amostras.values())} amostras gravadas em {self.caminho}.")
+
+metricas = Metricas()
 
 def safe_escape(text):
     """Escapa texto para HTML (mantém quebras de linha como \n)."""
@@ -68,37 +372,236 @@ def build_resumo_html(resumo_raw):
     return '\n\n'.join(bullets)
 
 
-def send_telegram_message(message):
-    """Envia uma mensagem formatada para o Telegram (HTML) com logs detalhados e truncamento."""
+def divide_mensagem_telegram(message, limite=TELEGRAM_MAX_LEN, separadores=(SEPARADOR_DIGEST, '\n\n', '\n', ' ')):
+    """
+    Divide a mensagem em partes de até `limite` caracteres sem quebrar tags HTML:
+    primeiro entre alertas de um digest, depois entre os bullets de build_resumo_html ('\n\n'),
+    depois entre linhas e palavras. Só como último recurso corta no meio do texto.
+    """
+    if len(message) <= limite:
+        return [message]
+    if not separadores:
+        return [message[i:i + limite] for i in range(0, len(message), limite)]
+
+    separador, demais = separadores[0], separadores[1:]
+    partes = []
+    atual = ''
+    for pedaco in message.split(separador):
+        candidato = atual + separador + pedaco if atual else pedaco
+        if len(candidato) <= limite:
+            atual = candidato
+            continue
+        if atual:
+            partes.append(atual)
+        if len(pedaco) <= limite:
+            atual = pedaco
+        else:
+            subpartes = divide_mensagem_telegram(pedaco, limite, demais)
+            partes.extend(subpartes[:-1])
+            atual = subpartes[-1]
+    if atual:
+        partes.append(atual)
+    return partes
+
+def monta_partes_digest(pendentes, limite=TELEGRAM_MAX_LEN):
+    """
+    Distribui as mensagens pendentes da fila em partes de até `limite` caracteres sem cortar alertas,
+    para que cada parte saiba quais linhas da fila entrega. Cada parte é um dict com:
+       - texto: o que vai para o Telegram (a primeira de um digest leva o cabeçalho);
+       - ids: as linhas da fila contidas na parte;
+       - peca: índice do pedaço, quando uma mensagem sozinha excede o limite (None nos demais casos);
+       - ultima: se a parte conclui as mensagens de `ids`.
+    Pedaços já entregues de uma mensagem longa (partes_entregues) não são montados de novo.
+    """
+    partes = []
+    textos, ids = [], []
+    if len(pendentes) > 1:
+        logging.info(f" [TELEGRAM] Agrupando {len(pendentes)} alertas em um digest.")
+        textos.append(f"<b>📬 {len(pendentes)} novas vagas encontradas</b>")
+
+    def fecha():
+        if ids:
+            partes.append({'texto': SEPARADOR_DIGEST.join(textos), 'ids': list(ids), 'peca': None, 'ultima': True})
+            textos.clear()
+            ids.clear()
+
+    for mensagem in pendentes:
+        if len(mensagem['texto']) > limite:
+            fecha()
+            pecas = divide_mensagem_telegram(mensagem['texto'], limite)
+            for indice in range(mensagem['partes_entregues'], len(pecas)):
+                partes.append({'texto': pecas[indice], 'ids': [mensagem['id']], 'peca': indice, 'ultima': indice == len(pecas) - 1})
+            continue
+        if len(SEPARADOR_DIGEST.join(textos + [mensagem['texto']])) > limite:
+            if ids:
+                fecha()
+            else:
+                textos.clear()
+        textos.append(mensagem['texto'])
+        ids.append(mensagem['id'])
+    fecha()
+    return partes
+
+def send_telegram_message(message, session=None, chat_id=None):
+    """
+    Envia uma mensagem formatada (até 4096 caracteres) para o Telegram (HTML) com logs detalhados.
+    Retorna a resposta HTTP, ou None em caso de falha de rede.
+    """
     if not message:
-        return
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    
-    TELEGRAM_MAX_LEN = 4096
-    if len(message) > TELEGRAM_MAX_LEN:
-        logging.warning("Mensagem excede 4096 caracteres — truncando antes do envio.")
-        message = message[:TELEGRAM_MAX_LEN - 80] + "\n\n[...mensagem truncada...]"
+        return None
+    url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_TOKEN}/sendMessage"
 
     payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
+        'chat_id': chat_id or TELEGRAM_CHAT_ID,
         'text': message,
         'parse_mode': 'HTML', 
         'disable_web_page_preview': True
     }
-    response = None
     try:
-        response = requests.post(url, data=payload, timeout=15)
-        response.raise_for_status()
-        logging.info(" [TELEGRAM] Mensagem enviada com sucesso!")
+        response = (session or requests).post(url, data=payload, timeout=15)
     except requests.exceptions.RequestException as e:
-        resp_text = "<sem resposta>"
-        try:
-            if response is not None:
-                resp_text = response.text
-        except Exception:
-            pass
-        logging.error(f"❌ [TELEGRAM] Erro ao enviar mensagem: {e}. Resposta Telegram: {resp_text}")
+        logging.error(f"❌ [TELEGRAM] Erro ao enviar mensagem: {e}. Resposta Telegram: <sem resposta>")
+        return None
+
+    if response.ok:
+        logging.info(" [TELEGRAM] Mensagem enviada com sucesso!")
+    else:
+        logging.error(f"❌ [TELEGRAM] Erro ao enviar mensagem: HTTP {response.status_code}. Resposta Telegram: {response.text}")
+    return response
+
+class NotificadorTelegram:
+    """
+    Worker de envio para o Telegram, desacoplado do scraping.
+    - enviar() só grava o alerta na fila persistente (tabela fila_telegram) e retorna na hora;
+      mensagens não entregues sobrevivem a reinícios.
+    - Alertas que chegam em rajada (dentro de TELEGRAM_JANELA_DIGEST) viram um único digest.
+    - Mensagens acima de 4096 caracteres são divididas nos limites dos bullets.
+    - A entrega é registrada por parte: o que já saiu sai da fila (ou conta em partes_entregues)
+      e não é reenviado; uma mensagem recusada pelo Telegram (4xx) é isolada e descartada sozinha.
+    - Uma única Session HTTP, limites por chat e global, e respeito ao retry_after do 429.
+    - Em modo worker, só o dono do lease LEASE_NOTIFICADOR entrega a fila; os demais apenas enfileiram.
+    """
+
+    def __init__(self, chat_id=None):
+        self.chat_id = chat_id or TELEGRAM_CHAT_ID
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='telegram')
+        self._evento = None
+        self._loop = None
+        self.pode_enviar = lambda: True
+
+    def enviar(self, message, search_term=None, vagas_ids=()):
+        """
+        Coloca a mensagem na fila persistente de envio (não bloqueia o scraping).
+        `vagas_ids` são as vagas do pipeline do termo que o alerta cobre: elas viram 'notificada' junto.
+        """
+        if not message:
+            return
+        repositorio.enfileira_mensagem(self.chat_id, message, search_term, vagas_ids)
+        if self._evento is not None:
+            self._loop.call_soon_threadsafe(self._evento.set)
 
+    def fechar(self):
+        self.session.close()
+        self.executor.shutdown(wait=False)
+
+    async def executar(self):
+        """Loop do worker: aguarda alertas, monta digests e os entrega respeitando os limites do Telegram."""
+        self._loop = asyncio.get_running_loop()
+        self._evento = asyncio.Event()
+        self._evento.set()
+        limite_global = LimitadorTokenBucket(TELEGRAM_MENSAGENS_POR_SEGUNDO, TELEGRAM_MENSAGENS_POR_SEGUNDO)
+        limite_chat_segundo = LimitadorTokenBucket(TELEGRAM_MENSAGENS_POR_SEGUNDO_CHAT, 1)
+        limite_chat_minuto = LimitadorTokenBucket(TELEGRAM_MENSAGENS_POR_MINUTO_CHAT / 60.0, TELEGRAM_MENSAGENS_POR_MINUTO_CHAT)
+
+        while True:
+            try:
+                await asyncio.wait_for(self._evento.wait(), TELEGRAM_JANELA_DIGEST)
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+            if not self.pode_enviar():
+                continue
+            pendentes = repositorio.mensagens_pendentes(self.chat_id)
+            if not pendentes:
+                continue
+
+            if len(pendentes) == 1 and time.time() - pendentes[0]['criado_em'] < TELEGRAM_JANELA_DIGEST:
+                await asyncio.sleep(TELEGRAM_JANELA_DIGEST)
+                pendentes = repositorio.mensagens_pendentes(self.chat_id)
+
+            textos = {mensagem['id']: mensagem['texto'] for mensagem in pendentes}
+            tentativas_anteriores = {mensagem['id']: mensagem['tentativas'] for mensagem in pendentes}
+            partes = monta_partes_digest(pendentes)
+            while partes:
+                parte = partes.pop(0)
+                await limite_global.adquirir()
+                await limite_chat_segundo.adquirir()
+                await limite_chat_minuto.adquirir()
+                resultado = await self._entrega(parte['texto'])
+
+                # A fila é atualizada parte a parte: o que já saiu nunca é reenviado.
+                if resultado == 'entregue':
+                    if parte['ultima']:
+                        repositorio.remove_mensagens(parte['ids'])
+                    else:
+                        repositorio.registra_parte_entregue(parte['ids'][0], parte['peca'] + 1)
+                elif resultado == 'recusada' and len(parte['ids']) > 1:
+                    # O Telegram recusou o conteúdo de uma das mensagens: cada uma segue sozinha para isolar a culpada.
+                    logging.warning(f" [TELEGRAM] Digest recusado. Reenviando {len(parte['ids'])} alertas um a um.")
+                    partes[:0] = [{'texto': textos[i], 'ids': [i], 'peca': None, 'ultima': True} for i in parte['ids']]
+                elif resultado == 'recusada':
+                    descartada = parte['ids'][0]
+                    logging.error(f"❌ [TELEGRAM] Mensagem {descartada} recusada pelo Telegram. Descartada sem afetar as demais.")
+                    repositorio.remove_mensagens([descartada])
+                    partes = [p for p in partes if descartada not in p['ids']]
+                else:
+                    tentativas = repositorio.registra_tentativa(parte['ids'])
+                    descartadas = [i for i in parte['ids'] if tentativas_anteriores[i] + 1 >= TELEGRAM_MAX_TENTATIVAS]
+                    if descartadas:
+                        logging.error(f"❌ [TELEGRAM] Descartando {len(descartadas)} mensagens após {TELEGRAM_MAX_TENTATIVAS} tentativas.")
+                        repositorio.remove_mensagens(descartadas)
+                    espera = min(RETRY_DELAY * (2 ** tentativas), TEMPO_ESPERA)
+                    logging.info(f" [TELEGRAM] Nova tentativa de envio em {espera}s.")
+                    await asyncio.sleep(espera)
+                    self._evento.set()
+                    break
+
+            if repositorio.mensagens_pendentes(self.chat_id, limite=1):
+                self._evento.set()
+
+    async def _entrega(self, parte):
+        """
+        Envia uma parte; em 429 espera o retry_after indicado pelo Telegram e tenta de novo.
+        Retorna 'entregue', 'recusada' (4xx do próprio conteúdo, como HTML inválido: repetir não adianta)
+        ou 'falha' (rede, 5xx, 429 persistente ou erro de token/chat, que vale para todas as mensagens).
+        """
+        for attempt in range(MAX_RETRIES):
+            with metricas.cronometro('notify'):
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, functools.partial(send_telegram_message, parte, self.session, self.chat_id)
+                )
+            if response is not None and response.ok:
+                return 'entregue'
+            if response is not None and 400 <= response.status_code < 500 and response.status_code not in (401, 403, 404, 429):
+                return 'recusada'
+            if response is None or response.status_code != 429:
+                return 'falha'
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after', RETRY_DELAY)
+            except ValueError:
+                retry_after = RETRY_DELAY
+            logging.warning(f" [TELEGRAM] Limite de envio atingido (429). Aguardando {retry_after}s.")
+            await asyncio.sleep(retry_after)
+        return 'falha'
+
+
+RESUMO_SEM_DESCRICAO = "\n[Análise Gemini - Descrição não disponível para análise.]"
+
+def descricao_resumivel(descricao_completa):
+    """Só uma descrição de verdade (não 'N/A', com ao menos 50 caracteres) vai para a IA e tem o resumo guardado."""
+    return bool(descricao_completa) and descricao_completa != 'N/A' and len(descricao_completa) >= 50
 
 def analisa_vaga_com_ia(client, descricao_completa):
     """Usa o Gemini para resumir a descrição da vaga com até 3 tentativas (Retry)."""
@@ -107,8 +610,8 @@ def analisa_vaga_com_ia(client, descricao_completa):
          logging.warning(" [IA] Chamada de IA real falhou por falta de cliente. Usando Mock simples.")
          return "Falha ao iniciar a IA. Verifique a chave."
          
-    if not descricao_completa or len(descricao_completa) < 50:
-        return "\n[Análise Gemini - Descrição não disponível para análise.]"
+    if not descricao_resumivel(descricao_completa):
+        return RESUMO_SEM_DESCRICAO
         
     for attempt in range(MAX_RETRIES):
         try:
@@ -125,82 +628,1267 @@ def analisa_vaga_com_ia(client, descricao_completa):
             if attempt == MAX_RETRIES - 1:
                 return f"\n[Análise Gemini - FALHA CRÍTICA após {MAX_RETRIES} tentativas. Erro: {error_message}]"
             
-            sleep_time = 2 ** attempt
-            logging.info(f" [IA RETRY]: Modelo sobrecarregado. Aguardando {sleep_time}s antes de tentar novamente...")
+            sleep_time = atraso_com_jitter(attempt, 1)
+            logging.info(f" [IA RETRY]: Modelo sobrecarregado. Aguardando {sleep_time:.1f}s antes de tentar novamente...")
             time.sleep(sleep_time)
 
     return "\n[Análise Gemini - FALHA INESPERADA. Verifique a chave ou o serviço.]"
 
-def inicializa_db_vagas():
-    """Cria a tabela de vagas com a chave composta (id + busca_termo)."""
-    con = sqlite3.connect(DB_VAGAS_NOME)
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS vagas_encontradas (
-            vagas_id TEXT NOT NULL, 
-            busca_termo TEXT NOT NULL,
+def analisa_lote_com_ia(client, descricoes):
+    """
+    Resume várias descrições em uma única chamada ao Gemini (prompt empacotado).
+    Retorna {índice: resumo} apenas para as vagas que vieram na resposta; as ausentes
+    devem ser resumidas individualmente por quem chamou.
+    """
+    if not client:
+        return {}
+
+    vagas_empacotadas = "\n\n".join(
+        f"### VAGA {indice + 1}\n{descricao}" for indice, descricao in enumerate(descricoes)
+    )
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = client.models.generate_content(
+                model='gemini-2.5-flash',
+                contents=[prompt_sistema, prompt_lote, vagas_empacotadas],
+            )
+            partes = MARCADOR_VAGA_LOTE.split(response.text)
+            resumos = {}
+            for numero, texto in zip(partes[1::2], partes[2::2]):
+                indice = int(numero) - 1
+                if 0 <= indice < len(descricoes) and texto.strip():
+                    resumos[indice] = "\n" + texto.strip()
+            return resumos
+
+        except Exception as e:
+            logging.error(f" [IA ERROR]: Falha no lote ({len(descricoes)} vagas), tentativa {attempt + 1}. Erro: {e}")
+
+            if attempt < MAX_RETRIES - 1:
+                time.sleep(atraso_com_jitter(attempt, 1))
+
+    return {}
+
+def normaliza_descricao(descricao_completa):
+    """Normaliza a descrição (caixa e espaços) para que reposts idênticos gerem o mesmo hash."""
+    return ' '.join((descricao_completa or '').split()).casefold()
+
+def hash_descricao(descricao_completa):
+    return hashlib.sha256(normaliza_descricao(descricao_completa).encode('utf-8')).hexdigest()
+
+def assinatura_simhash(texto):
+    """
+    SimHash de 64 bits do texto normalizado, sobre trigramas de palavras.
+    Textos quase iguais (um parágrafo a mais, outra cidade) diferem em poucos bits.
+    """
+    palavras = normaliza_descricao(texto).split()
+    trigramas = {' '.join(palavras[i:i + 3]) for i in range(max(1, len(palavras) - 2))}
+    pesos = [0] * 64
+    for trigrama in trigramas:
+        valor = int.from_bytes(hashlib.blake2b(trigrama.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            pesos[bit] += 1 if valor >> bit & 1 else -1
+    return sum(1 << bit for bit, peso in enumerate(pesos) if peso > 0)
+
+def bandas_simhash(assinatura):
+    """Divide a assinatura em SIMHASH_BANDAS faixas de 64 // SIMHASH_BANDAS bits (as chaves do índice LSH); bits que sobram ficam de fora."""
+    largura = 64 // SIMHASH_BANDAS
+    return [assinatura >> (banda * largura) & ((1 << largura) - 1) for banda in range(SIMHASH_BANDAS)]
+
+def distancia_hamming(a, b):
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+@cronometrado('parse')
+def simhash_vaga(details):
+    """Assinatura de título + empresa + descrição, ou None se a vaga não tem descrição para comparar."""
+    descricao_completa = details.get('descricao_completa')
+    if not descricao_completa or len(descricao_completa) < 50:
+        return None
+    return assinatura_simhash(f"{details.get('titulo', '')} {details.get('empresa', '')} {descricao_completa}")
+
+class FakeGeminiClient:
+    """
+    Cliente Gemini local, compatível com client.models.generate_content.
+    Gera resumos determinísticos sem rede, para rodar o pipeline de IA offline.
+    """
+
+    class _Resposta:
+        def __init__(self, text):
+            self.text = text
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.chamadas = 0
+        self.models = self
+
+    def _resume(self, descricao):
+        frases = [f.strip() for f in re.split(r'(?<=[.!?])\s+', descricao.strip()) if f.strip()]
+        return "\n\n".join(frases[:4]) or "Descrição vazia."
+
+    def generate_content(self, model, contents):
+        self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        texto = contents[-1]
+        partes = MARCADOR_VAGA_LOTE.split(texto)
+        if len(partes) == 1:
+            return self._Resposta(self._resume(texto))
+        return self._Resposta("\n\n".join(
+            f"### VAGA {numero}\n{self._resume(descricao)}" for numero, descricao in zip(partes[1::2], partes[2::2])
+        ))
+
+class ResumidorIA:
+    """
+    Estágio de resumo por IA.
+    - Cache persistente por hash da descrição normalizada: descrições idênticas nunca são resumidas duas vezes.
+    - Descrições pendentes são agrupadas por até IA_JANELA_LOTE segundos (ou IA_TAMANHO_LOTE itens)
+      e enviadas juntas em um único prompt.
+    - No máximo IA_MAX_CONCORRENCIA chamadas ao Gemini em paralelo.
+    """
+
+    def __init__(self, motor, max_concorrencia=IA_MAX_CONCORRENCIA, tamanho_lote=IA_TAMANHO_LOTE, janela=IA_JANELA_LOTE):
+        self.motor = motor
+        self.tamanho_lote = tamanho_lote
+        self.janela = janela
+        self.semaforo = asyncio.Semaphore(max_concorrencia)
+        self.pendentes = asyncio.Queue()
+        self.em_andamento = {}
+        self.despachante = None
+
+    async def resumir(self, descricao_completa):
+        """Retorna o resumo da descrição, vindo do cache ou do próximo lote enviado ao Gemini."""
+        if not gemini_client or not descricao_resumivel(descricao_completa):
+            return await self.motor.executar(analisa_vaga_com_ia, gemini_client, descricao_completa)
+
+        chave = hash_descricao(descricao_completa)
+        resumo_ia = repositorio.busca_resumo_por_hash(chave)
+        if resumo_ia:
+            logging.info(" [IA CACHE] Descrição já resumida anteriormente. Reaproveitando resumo.")
+            return resumo_ia
+
+        futuro = self.em_andamento.get(chave)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().create_future()
+            self.em_andamento[chave] = futuro
+            self.pendentes.put_nowait((chave, descricao_completa, futuro))
+            if self.despachante is None or self.despachante.done():
+                self.despachante = asyncio.ensure_future(self._despacha())
+        return await asyncio.shield(futuro)
+
+    async def _despacha(self):
+        metricas.desvincula_ciclo()
+        while not self.pendentes.empty():
+            lote = [self.pendentes.get_nowait()]
+            limite = time.monotonic() + self.janela
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self.pendentes.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            await self.semaforo.acquire()
+            asyncio.ensure_future(self._processa_lote(lote))
+
+    async def _processa_lote(self, lote):
+        try:
+            resumos = {}
+            if len(lote) > 1:
+                logging.info(f" [IA LOTE] Enviando {len(lote)} descrições em um único prompt.")
+                resumos = await self.motor.executar(
+                    analisa_lote_com_ia, gemini_client, [descricao for _, descricao, _ in lote]
+                )
+
+            for indice, (chave, descricao_completa, futuro) in enumerate(lote):
+                resumo_ia = resumos.get(indice)
+                if resumo_ia is None:
+                    resumo_ia = await self.motor.executar(analisa_vaga_com_ia, gemini_client, descricao_completa)
+                if 'FALHA' not in resumo_ia:
+                    repositorio.salva_resumo_por_hash(chave, resumo_ia)
+                self.em_andamento.pop(chave, None)
+                if not futuro.done():
+                    futuro.set_result(resumo_ia)
+        except Exception as e:
+            for chave, _, futuro in lote:
+                self.em_andamento.pop(chave, None)
+                if not futuro.done():
+                    futuro.set_exception(e)
+        finally:
+            self.semaforo.release()
+
+class RepositorioVagas:
+    """
+    Camada de acesso ao banco de vagas.
+    Mantém uma única conexão SQLite de longa duração (WAL + pragmas ajustados),
+    grava as vagas de um ciclo em uma só transação e responde consultas em lote.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA mmap_size = 67108864",
+        "PRAGMA busy_timeout = 5000",
+    )
+    LIMITE_PARAMETROS = 900
+    COLUNAS_PIPELINE = ('dados', 'grupo', 'alertar', 'resumo_ia', 'relevancia')
+    COLUNAS_JSON_PIPELINE = ('dados', 'relevancia')
+    DDL_VAGAS = """
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            vagas_id TEXT PRIMARY KEY,
             titulo TEXT,
             empresa TEXT,
             localizacao TEXT,
             salario TEXT,
             modalidade TEXT,
             url_vaga TEXT,
-            resumo_ia TEXT,
-            data_extracao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (vagas_id, busca_termo)
+            descricao_completa TEXT,
+            exigencias TEXT,
+            hash_descricao TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            atualizado_em REAL NOT NULL DEFAULT 0,
+            salario_min REAL,
+            salario_max REAL,
+            salario_periodo TEXT,
+            modalidade_normalizada TEXT,
+            cidade TEXT,
+            uf TEXT,
+            normalizado_em REAL
         )
-    """)
-    con.commit()
-    con.close()
-    logging.info(f" [DB] Banco de dados '{DB_VAGAS_NOME}' inicializado.")
-
-def salva_vaga_no_db(dados):
-    """Salva a vaga no DB."""
-    con = sqlite3.connect(DB_VAGAS_NOME)
-    cur = con.cursor()
-    try:
-        cur.execute("""
-            INSERT OR REPLACE INTO vagas_encontradas (
-                vagas_id, busca_termo, titulo, empresa, localizacao, salario, 
-                modalidade, url_vaga, resumo_ia
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, dados)
-        con.commit()
-    except sqlite3.Error as e:
-        logging.error(f" [DB] Erro ao salvar vaga: {e}")
-    finally:
-        con.close()
+    """
+    COLUNAS_NORMALIZADAS = (
+        ('salario_min', 'REAL'), ('salario_max', 'REAL'), ('salario_periodo', 'TEXT'),
+        ('modalidade_normalizada', 'TEXT'), ('cidade', 'TEXT'), ('uf', 'TEXT'), ('normalizado_em', 'REAL'),
+    )
+    COLUNAS_EXPORTACAO = (
+        ('data_extracao', 'texto'), ('busca_termo', 'texto'), ('vagas_id', 'texto'), ('titulo', 'texto'),
+        ('empresa', 'texto'), ('localizacao', 'texto'), ('salario', 'texto'), ('modalidade', 'texto'),
+        ('url_vaga', 'texto'), ('salario_min', 'real'), ('salario_max', 'real'), ('salario_periodo', 'texto'),
+        ('modalidade_normalizada', 'texto'), ('cidade', 'texto'), ('uf', 'texto'),
+    )
 
-def limpa_vagas_por_termo(search_term):
-    """Limpa todas as vagas para um termo específico."""
-    con = sqlite3.connect(DB_VAGAS_NOME)
-    cur = con.cursor()
-    try:
-        cur.execute("DELETE FROM vagas_encontradas WHERE busca_termo = ?", (search_term,))
-        con.commit()
-        logging.info(f" [DB LIMPEZA] Limpeza forçada concluída para o termo '{search_term}'.")
-    except sqlite3.Error as e:
-        logging.error(f" [DB LIMPEZA] Erro ao limpar vagas: {e}")
-    finally:
-        con.close()
+    def __init__(self, caminho=DB_VAGAS_NOME):
+        self.caminho = caminho
+        self.con = sqlite3.connect(caminho, check_same_thread=False)
+        self.con.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        for pragma in self.PRAGMAS:
+            self.con.execute(pragma)
+        self.inicializa_db_vagas()
+
+    def fechar(self):
+        with self._lock:
+            self.con.close()
+
+    def inicializa_db_vagas(self):
+        """
+        Cria as tabelas de vagas:
+           - vagas: dados da vaga (detalhes + hash da descrição), chave vagas_id.
+           - resumos_ia: resumos da IA deduplicados por hash da descrição normalizada.
+           - vagas_encontradas: vínculo termo -> vaga, chave composta (id + busca_termo),
+             com índices por termo/data e por data (consultas e retenção sem varrer a tabela).
+           - assinaturas_vagas: SimHash de cada vaga com descrição, indexado por banda (LSH),
+             e o grupo de quase-duplicatas a que ela pertence.
+           - agregados_termo: indicadores por termo (taxa de chegada, salário mediano, modalidades,
+             cidade mais frequente) pré-calculados para painéis e relatórios.
+           - pipeline_vagas: fila durável das vagas descobertas e ainda não persistidas, com o
+             estado de cada uma (descoberta -> detalhada -> resumida -> notificada); a vaga sai
+             dela ao ser gravada em vagas_encontradas (persistida).
+        Bancos no formato antigo (detalhes repetidos por termo, resumo gravado em cada vaga) são migrados.
+        """
+        with self._lock, self.con:
+            cur = self.con.cursor()
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS resumos_ia (
+                    hash_descricao TEXT PRIMARY KEY,
+                    resumo_ia TEXT NOT NULL,
+                    criado_em REAL NOT NULL
+                )
+            """)
+
+            colunas_vagas = [linha[1] for linha in cur.execute("PRAGMA table_info(vagas)")]
+            if 'resumo_ia' in colunas_vagas:
+                logging.info(" [DB] Movendo os resumos da IA de 'vagas' para a tabela 'resumos_ia'.")
+                cur.execute("ALTER TABLE vagas RENAME TO vagas_legado")
+            cur.execute(self.DDL_VAGAS.format(tabela='vagas'))
+            if 'resumo_ia' in colunas_vagas:
+                cur.execute("""
+                    INSERT INTO vagas (
+                        vagas_id, titulo, empresa, localizacao, salario, modalidade, url_vaga,
+                        descricao_completa, exigencias, etag, last_modified, atualizado_em
+                    )
+                    SELECT vagas_id, titulo, empresa, localizacao, salario, modalidade, url_vaga,
+                           descricao_completa, exigencias, etag, last_modified, atualizado_em
+                    FROM vagas_legado
+                """)
+                self._vincula_resumos_legados(cur, cur.execute("""
+                    SELECT vagas_id, descricao_completa, resumo_ia FROM vagas_legado
+                    WHERE descricao_completa IS NOT NULL OR resumo_ia IS NOT NULL
+                """).fetchall())
+                cur.execute("DROP TABLE vagas_legado")
+
+            colunas = [linha[1] for linha in cur.execute("PRAGMA table_info(vagas_encontradas)")]
+            if 'titulo' in colunas:
+                logging.info(" [DB] Migrando 'vagas_encontradas' para o formato termo -> vaga.")
+                cur.execute("""
+                    INSERT OR IGNORE INTO vagas (
+                        vagas_id, titulo, empresa, localizacao, salario, modalidade, url_vaga
+                    )
+                    SELECT vagas_id, titulo, empresa, localizacao, salario, modalidade, url_vaga
+                    FROM vagas_encontradas
+                    ORDER BY data_extracao DESC
+                """)
+                self._vincula_resumos_legados(cur, cur.execute("""
+                    SELECT vagas_id, NULL, resumo_ia FROM vagas_encontradas
+                    WHERE resumo_ia IS NOT NULL AND resumo_ia NOT LIKE '[Análise de IA ignorada%'
+                    ORDER BY data_extracao DESC
+                """).fetchall())
+                cur.execute("ALTER TABLE vagas_encontradas RENAME TO vagas_encontradas_legado")
+
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS vagas_encontradas (
+                    vagas_id TEXT NOT NULL, 
+                    busca_termo TEXT NOT NULL,
+                    data_extracao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (vagas_id, busca_termo)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_encontradas_termo_data ON vagas_encontradas (busca_termo, data_extracao)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_encontradas_data ON vagas_encontradas (data_extracao)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_vagas_empresa ON vagas (empresa COLLATE NOCASE)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_vagas_hash_descricao ON vagas (hash_descricao)")
+
+            colunas_vagas = {linha[1] for linha in cur.execute("PRAGMA table_info(vagas)")}
+            for coluna, tipo in self.COLUNAS_NORMALIZADAS:
+                if coluna not in colunas_vagas:
+                    cur.execute(f"ALTER TABLE vagas ADD COLUMN {coluna} {tipo}")
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_vagas_a_normalizar ON vagas (vagas_id)
+                WHERE normalizado_em IS NULL OR normalizado_em < atualizado_em
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS agregados_termo (
+                    busca_termo TEXT PRIMARY KEY,
+                    janela_dias REAL NOT NULL,
+                    vagas_janela INTEGER NOT NULL,
+                    vagas_por_dia REAL NOT NULL,
+                    vagas_com_salario INTEGER NOT NULL,
+                    salario_mediano REAL,
+                    presencial INTEGER NOT NULL,
+                    hibrido INTEGER NOT NULL,
+                    remoto INTEGER NOT NULL,
+                    cidade_principal TEXT,
+                    calculado_em REAL NOT NULL
+                )
+            """)
+
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS assinaturas_vagas (
+                    vagas_id TEXT PRIMARY KEY,
+                    simhash INTEGER NOT NULL,
+                    {''.join(f"banda_{banda} INTEGER NOT NULL, " for banda in range(SIMHASH_BANDAS))}
+                    grupo TEXT NOT NULL
+                )
+            """)
+            for banda in range(SIMHASH_BANDAS):
+                cur.execute(f"CREATE INDEX IF NOT EXISTS idx_assinaturas_banda_{banda} ON assinaturas_vagas (banda_{banda})")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_assinaturas_grupo ON assinaturas_vagas (grupo)")
+
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS fila_telegram (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    texto TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    partes_entregues INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            if 'partes_entregues' not in {linha[1] for linha in cur.execute("PRAGMA table_info(fila_telegram)")}:
+                cur.execute("ALTER TABLE fila_telegram ADD COLUMN partes_entregues INTEGER NOT NULL DEFAULT 0")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    visto_em REAL NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS leases_shard (
+                    shard INTEGER PRIMARY KEY,
+                    worker_id TEXT,
+                    expira_em REAL NOT NULL DEFAULT 0
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS marcas_termo (
+                    busca_termo TEXT PRIMARY KEY,
+                    ultimo_vagas_id TEXT NOT NULL,
+                    visto_em REAL NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS pipeline_vagas (
+                    ordem INTEGER PRIMARY KEY AUTOINCREMENT,
+                    vagas_id TEXT NOT NULL,
+                    busca_termo TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    dados TEXT NOT NULL,
+                    grupo TEXT,
+                    alertar INTEGER,
+                    resumo_ia TEXT,
+                    relevancia TEXT,
+                    descoberta_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    atualizado_em REAL NOT NULL,
+                    UNIQUE (vagas_id, busca_termo)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_termo_estado ON pipeline_vagas (busca_termo, estado)")
+
+            if 'titulo' in colunas:
+                cur.execute("""
+                    INSERT INTO vagas_encontradas (vagas_id, busca_termo, data_extracao)
+                    SELECT vagas_id, busca_termo, data_extracao FROM vagas_encontradas_legado
+                """)
+                cur.execute("DROP TABLE vagas_encontradas_legado")
+
+            # Versões anteriores guardavam o aviso de descrição ausente como resumo, travando a vaga sem detalhe.
+            cur.execute("DELETE FROM resumos_ia WHERE resumo_ia = ?", (RESUMO_SEM_DESCRICAO,))
+
+        logging.info(f" [DB] Banco de dados '{self.caminho}' inicializado.")
+
+    def _vincula_resumos_legados(self, cur, linhas):
+        """
+        Migração: liga cada vaga (vagas_id, descricao_completa, resumo_ia) ao hash da sua descrição e
+        move o resumo para 'resumos_ia'. Sem descrição guardada, a chave é o hash do próprio resumo.
+        """
+        agora = time.time()
+        for vagas_id, descricao_completa, resumo_ia in linhas:
+            chave = hash_descricao(descricao_completa or resumo_ia)
+            cur.execute("UPDATE vagas SET hash_descricao = ? WHERE vagas_id = ? AND hash_descricao IS NULL", (chave, vagas_id))
+            if resumo_ia:
+                cur.execute(
+                    "INSERT OR IGNORE INTO resumos_ia (hash_descricao, resumo_ia, criado_em) VALUES (?, ?, ?)",
+                    (chave, resumo_ia, agora)
+                )
+
+    @cronometrado('db')
+    def ids_existentes(self, vagas_ids, busca_termo):
+        """
+        Retorna o subconjunto de vagas_ids que já está salvo para o termo (consulta em lote).
+        Vagas ainda no pipeline também contam: elas já foram descobertas e não devem ser coletadas de novo.
+        """
+        vagas_ids = list(vagas_ids)
+        existentes = set()
+        with self._lock:
+            for inicio in range(0, len(vagas_ids), self.LIMITE_PARAMETROS):
+                lote = vagas_ids[inicio:inicio + self.LIMITE_PARAMETROS]
+                marcadores = ', '.join('?' * len(lote))
+                for tabela in ('vagas_encontradas', 'pipeline_vagas'):
+                    cur = self.con.execute(
+                        f"SELECT vagas_id FROM {tabela} WHERE busca_termo = ? AND vagas_id IN ({marcadores})",
+                        (busca_termo, *lote)
+                    )
+                    existentes.update(linha[0] for linha in cur)
+        return existentes
+
+    @cronometrado('db')
+    def has_data_for_term(self, search_term):
+        """
+        Checa se já há dados salvos para um termo de busca específico (para no primeiro registro).
+        A marca d'água também conta, para que um termo com todo o histórico arquivado não volte à população inicial.
+        """
+        with self._lock:
+            cur = self.con.execute("""
+                SELECT EXISTS (SELECT 1 FROM vagas_encontradas WHERE busca_termo = :termo)
+                    OR EXISTS (SELECT 1 FROM marcas_termo WHERE busca_termo = :termo)
+            """, {'termo': search_term})
+            return bool(cur.fetchone()[0])
+
+    def taxa_chegada(self, busca_termo, janela_dias):
+        """
+        Vagas novas por segundo para o termo na janela de histórico.
+        O lote da população inicial (primeiro data_extracao do termo) não entra na conta.
+        """
+        with self._lock:
+            quantidade, dias_observados = self.con.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM vagas_encontradas
+                     WHERE busca_termo = :termo
+                       AND julianday(data_extracao) > MAX(inicio + 1.0 / 1440, julianday('now') - :dias)),
+                    julianday('now') - MAX(inicio, julianday('now') - :dias)
+                FROM (SELECT MIN(julianday(data_extracao)) AS inicio
+                      FROM vagas_encontradas WHERE busca_termo = :termo)
+            """, {'termo': busca_termo, 'dias': janela_dias}).fetchone()
+        if not quantidade:
+            return 0.0
+        return quantidade / (max(dias_observados, 1.0 / 24) * 86400)
+
+    def enfileira_mensagem(self, chat_id, texto, busca_termo=None, vagas_ids=()):
+        """
+        Grava a mensagem na fila persistente do Telegram. Com `vagas_ids`, as vagas do termo passam a
+        'notificada' no pipeline na mesma transação: após uma queda, o alerta não se perde nem se repete.
+        """
+        agora = time.time()
+        with self._lock, self.con:
+            self.con.execute(
+                "INSERT INTO fila_telegram (chat_id, texto, criado_em) VALUES (?, ?, ?)",
+                (chat_id, texto, agora)
+            )
+            self.con.executemany(
+                "UPDATE pipeline_vagas SET estado = 'notificada', atualizado_em = ? WHERE busca_termo = ? AND vagas_id = ?",
+                [(agora, busca_termo, vagas_id) for vagas_id in vagas_ids]
+            )
+
+    def mensagens_pendentes(self, chat_id, limite=50):
+        """Mensagens ainda não entregues para o chat, da mais antiga para a mais nova."""
+        with self._lock:
+            cur = self.con.execute(
+                "SELECT id, texto, criado_em, tentativas, partes_entregues FROM fila_telegram WHERE chat_id = ? ORDER BY id LIMIT ?",
+                (chat_id, limite)
+            )
+            return [dict(linha) for linha in cur]
+
+    def remove_mensagens(self, ids):
+        with self._lock, self.con:
+            self.con.executemany("DELETE FROM fila_telegram WHERE id = ?", [(i,) for i in ids])
+
+    def registra_parte_entregue(self, id_mensagem, partes_entregues):
+        """Guarda quantos pedaços de uma mensagem longa já saíram, para que uma nova tentativa não os repita."""
+        with self._lock, self.con:
+            self.con.execute("UPDATE fila_telegram SET partes_entregues = ? WHERE id = ?", (partes_entregues, id_mensagem))
+
+    def registra_tentativa(self, ids):
+        """Incrementa o contador de tentativas das mensagens e retorna o maior valor."""
+        with self._lock, self.con:
+            self.con.executemany("UPDATE fila_telegram SET tentativas = tentativas + 1 WHERE id = ?", [(i,) for i in ids])
+            marcadores = ', '.join('?' * len(ids))
+            linha = self.con.execute(f"SELECT MAX(tentativas) FROM fila_telegram WHERE id IN ({marcadores})", ids).fetchone()
+        return linha[0] or 0
+
+    def registra_worker(self, worker_id, agora):
+        with self._lock, self.con:
+            self.con.execute("INSERT OR REPLACE INTO workers (worker_id, visto_em) VALUES (?, ?)", (worker_id, agora))
+
+    def remove_worker(self, worker_id):
+        with self._lock, self.con:
+            self.con.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def workers_ativos(self, visto_desde):
+        with self._lock:
+            cur = self.con.execute("SELECT worker_id FROM workers WHERE visto_em >= ? ORDER BY worker_id", (visto_desde,))
+            return [linha[0] for linha in cur]
+
+    def tenta_lease(self, shard, worker_id, agora, expira_em):
+        """Obtém/renova o lease do shard se ele estiver livre, vencido ou já for deste worker."""
+        with self._lock, self.con:
+            self.con.execute(
+                "INSERT OR IGNORE INTO leases_shard (shard, worker_id, expira_em) VALUES (?, NULL, 0)", (shard,)
+            )
+            cur = self.con.execute("""
+                UPDATE leases_shard SET worker_id = ?, expira_em = ?
+                WHERE shard = ? AND (worker_id IS NULL OR worker_id = ? OR expira_em < ?)
+            """, (worker_id, expira_em, shard, worker_id, agora))
+            return cur.rowcount == 1
+
+    def libera_lease(self, shard, worker_id):
+        with self._lock, self.con:
+            self.con.execute(
+                "UPDATE leases_shard SET worker_id = NULL, expira_em = 0 WHERE shard = ? AND worker_id = ?",
+                (shard, worker_id)
+            )
+
+    def leases_validos(self, agora):
+        with self._lock:
+            cur = self.con.execute(
+                "SELECT shard, worker_id, expira_em FROM leases_shard WHERE worker_id IS NOT NULL AND expira_em >= ?",
+                (agora,)
+            )
+            return [dict(linha) for linha in cur]
+
+    @cronometrado('db')
+    def limpa_vagas_por_termo(self, search_term):
+        """
+        Limpa, em uma transação, todas as vagas (inclusive as pendentes no pipeline) e a marca d'água de um
+        termo (--repopular): o próximo ciclo do termo refaz a população inicial, sem alertas. Como tudo sai
+        junto, nunca sobra um termo sem histórico e com marca, ou com vagas do pipeline de antes da limpeza.
+        """
+        try:
+            with self._lock, self.con:
+                self.con.execute("DELETE FROM vagas_encontradas WHERE busca_termo = ?", (search_term,))
+                self.con.execute("DELETE FROM pipeline_vagas WHERE busca_termo = ?", (search_term,))
+                self.con.execute("DELETE FROM marcas_termo WHERE busca_termo = ?", (search_term,))
+            logging.info(f" [DB LIMPEZA] Limpeza forçada concluída para o termo '{search_term}'.")
+        except sqlite3.Error as e:
+            logging.error(f" [DB LIMPEZA] Erro ao limpar vagas: {e}")
+
+    @cronometrado('db')
+    def busca_marca_termo(self, busca_termo):
+        """Retorna a marca d'água do termo (vaga mais recente já vista e quando), ou None."""
+        with self._lock:
+            linha = self.con.execute(
+                "SELECT ultimo_vagas_id, visto_em FROM marcas_termo WHERE busca_termo = ?", (busca_termo,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    @cronometrado('db')
+    def maior_id_termo(self, busca_termo):
+        """Maior vagas_id já salvo para o termo: a marca d'água de bancos anteriores à tabela marcas_termo."""
+        with self._lock:
+            linha = self.con.execute(
+                "SELECT MAX(CAST(vagas_id AS INTEGER)) FROM vagas_encontradas WHERE busca_termo = ? AND vagas_id GLOB '[0-9]*'",
+                (busca_termo,)
+            ).fetchone()
+        return str(linha[0]) if linha[0] is not None else None
+
+    @cronometrado('db')
+    def registra_descobertas(self, busca_termo, vagas, ultimo_vagas_id, estado='descoberta'):
+        """
+        Etapa de descoberta, em uma única transação:
+           - as vagas [(vagas_id, dados do card da busca)] entram no pipeline no `estado` indicado;
+           - o registro parcial das vagas ainda ausentes vai para o store (descrição NULL até a
+             página de detalhe ser baixada; vagas já conhecidas não são tocadas);
+           - a marca d'água do termo avança para a vaga mais recente da primeira página.
+        Se o processo cair depois daqui, o próximo ciclo retoma as vagas do pipeline em vez de redescobri-las.
+        """
+        agora = time.time()
+        try:
+            with self._lock, self.con:
+                self.con.executemany("""
+                    INSERT OR IGNORE INTO pipeline_vagas (vagas_id, busca_termo, url, estado, dados, atualizado_em)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(vagas_id, busca_termo, details['url'], estado, json.dumps(details), agora) for vagas_id, details in vagas])
+                self.con.executemany("""
+                    INSERT OR IGNORE INTO vagas (vagas_id, titulo, empresa, localizacao, salario, modalidade, url_vaga)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (vagas_id, details['titulo'], details['empresa'], details['localizacao'],
+                     details['salario'], details['modalidade'], details['url'])
+                    for vagas_id, details in vagas if vagas_id != 'N/A'
+                ])
+                if ultimo_vagas_id is not None:
+                    self.con.execute(
+                        "INSERT OR REPLACE INTO marcas_termo (busca_termo, ultimo_vagas_id, visto_em) VALUES (?, ?, ?)",
+                        (busca_termo, ultimo_vagas_id, agora)
+                    )
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao registrar vagas descobertas: {e}")
+
+    @cronometrado('db')
+    def pipeline_pendente(self, busca_termo, estado):
+        """Vagas do termo paradas no `estado` do pipeline, na ordem da descoberta (dados e relevância já decodificados)."""
+        with self._lock:
+            cur = self.con.execute("""
+                SELECT vagas_id, url, dados, grupo, alertar, resumo_ia, relevancia FROM pipeline_vagas
+                WHERE busca_termo = ? AND estado = ? ORDER BY ordem
+            """, (busca_termo, estado))
+            vagas = [dict(linha) for linha in cur]
+        for vaga in vagas:
+            for coluna in self.COLUNAS_JSON_PIPELINE:
+                if vaga[coluna] is not None:
+                    vaga[coluna] = json.loads(vaga[coluna])
+        return vagas
+
+    @cronometrado('db')
+    def avanca_pipeline(self, busca_termo, estado, vagas):
+        """
+        Passa as vagas do termo para o `estado` seguinte do pipeline, em uma transação.
+        `vagas` são dicts com 'vagas_id' e as colunas produzidas pela etapa (dados, grupo, alertar, resumo_ia, relevancia).
+        """
+        agora = time.time()
+        try:
+            with self._lock, self.con:
+                for vaga in vagas:
+                    colunas = [coluna for coluna in self.COLUNAS_PIPELINE if coluna in vaga]
+                    valores = [
+                        json.dumps(vaga[coluna]) if coluna in self.COLUNAS_JSON_PIPELINE and vaga[coluna] is not None else vaga[coluna]
+                        for coluna in colunas
+                    ]
+                    self.con.execute(
+                        f"UPDATE pipeline_vagas SET {''.join(f'{coluna} = ?, ' for coluna in colunas)}estado = ?, atualizado_em = ? "
+                        "WHERE busca_termo = ? AND vagas_id = ?",
+                        (*valores, estado, agora, busca_termo, vaga['vagas_id'])
+                    )
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao avançar vagas no pipeline para '{estado}': {e}")
+
+    @cronometrado('db')
+    def persiste_pipeline(self, busca_termo):
+        """
+        Última etapa: grava as vagas notificadas do termo em vagas_encontradas (data_extracao = hora da
+        descoberta) e as retira do pipeline, na mesma transação. Retorna quantas vagas foram persistidas.
+        """
+        try:
+            with self._lock, self.con:
+                cur = self.con.execute("""
+                    INSERT OR REPLACE INTO vagas_encontradas (vagas_id, busca_termo, data_extracao)
+                    SELECT vagas_id, busca_termo, descoberta_em FROM pipeline_vagas
+                    WHERE busca_termo = ? AND estado = 'notificada'
+                """, (busca_termo,))
+                self.con.execute("DELETE FROM pipeline_vagas WHERE busca_termo = ? AND estado = 'notificada'", (busca_termo,))
+                return cur.rowcount
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao persistir vagas do pipeline: {e}")
+            return 0
+
+    def contagem_pipeline(self):
+        """Quantas vagas estão paradas em cada estado do pipeline (todos os termos)."""
+        with self._lock:
+            cur = self.con.execute("SELECT estado, COUNT(*) FROM pipeline_vagas GROUP BY estado ORDER BY estado")
+            return {linha[0]: linha[1] for linha in cur}
+
+    @cronometrado('db')
+    def busca_vaga_cache(self, vagas_id):
+        """
+        Retorna os dados da vaga guardados no store (ou None se ainda não foi baixada).
+        Sem resumo próprio, vale o resumo da primeira vaga do seu grupo de quase-duplicatas.
+        """
+        with self._lock:
+            linha = self.con.execute("""
+                SELECT v.*, COALESCE(r.resumo_ia, rg.resumo_ia) AS resumo_ia FROM vagas v
+                LEFT JOIN resumos_ia r ON r.hash_descricao = v.hash_descricao
+                LEFT JOIN assinaturas_vagas a ON a.vagas_id = v.vagas_id
+                LEFT JOIN vagas g ON g.vagas_id = a.grupo
+                LEFT JOIN resumos_ia rg ON rg.hash_descricao = g.hash_descricao
+                WHERE v.vagas_id = ?
+            """, (vagas_id,)).fetchone()
+        return dict(linha) if linha else None
+
+    @cronometrado('db')
+    def salva_vaga_cache(self, vagas_id, details, etag=None, last_modified=None):
+        """
+        Grava os detalhes da vaga no store. O resumo da IA é ligado pelo hash da descrição:
+        se ela mudou, a vaga deixa de apontar para o resumo antigo.
+        """
+        try:
+            with self._lock, self.con:
+                self.con.execute("""
+                    INSERT INTO vagas (
+                        vagas_id, titulo, empresa, localizacao, salario, modalidade, url_vaga,
+                        descricao_completa, exigencias, hash_descricao, etag, last_modified, atualizado_em
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(vagas_id) DO UPDATE SET
+                        titulo = excluded.titulo,
+                        empresa = excluded.empresa,
+                        localizacao = excluded.localizacao,
+                        salario = excluded.salario,
+                        modalidade = excluded.modalidade,
+                        url_vaga = excluded.url_vaga,
+                        descricao_completa = excluded.descricao_completa,
+                        exigencias = excluded.exigencias,
+                        hash_descricao = excluded.hash_descricao,
+                        etag = excluded.etag,
+                        last_modified = excluded.last_modified,
+                        atualizado_em = excluded.atualizado_em
+                """, (
+                    vagas_id,
+                    details['titulo'].strip(),
+                    details['empresa'].strip(),
+                    details['localizacao'].strip(),
+                    details['salario'].strip(),
+                    details['modalidade'].strip(),
+                    details['url'].strip(),
+                    details['descricao_completa'],
+                    details['exigencias'],
+                    hash_descricao(details['descricao_completa']),
+                    etag,
+                    last_modified,
+                    time.time(),
+                ))
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao salvar vaga no cache: {e}")
+
+    @cronometrado('db')
+    def toca_vaga_cache(self, vagas_id):
+        """Marca a vaga como revalidada agora (resposta 304 do servidor)."""
+        with self._lock, self.con:
+            self.con.execute("UPDATE vagas SET atualizado_em = ? WHERE vagas_id = ?", (time.time(), vagas_id))
+
+    @cronometrado('db')
+    def busca_resumo_por_hash(self, hash_descricao):
+        """Retorna o resumo já gerado para uma descrição com este hash (ou None)."""
+        with self._lock:
+            linha = self.con.execute(
+                "SELECT resumo_ia FROM resumos_ia WHERE hash_descricao = ?", (hash_descricao,)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    @cronometrado('db')
+    def salva_resumo_por_hash(self, hash_descricao, resumo_ia):
+        """Guarda o resumo no cache por hash de descrição normalizada."""
+        try:
+            with self._lock, self.con:
+                self.con.execute(
+                    "INSERT OR REPLACE INTO resumos_ia (hash_descricao, resumo_ia, criado_em) VALUES (?, ?, ?)",
+                    (hash_descricao, resumo_ia, time.time())
+                )
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao salvar resumo no cache: {e}")
+
+    @cronometrado('db')
+    def salva_resumo_vaga(self, vagas_id, descricao_completa, resumo_ia):
+        """
+        Guarda o resumo da IA uma única vez em 'resumos_ia' e liga a vaga ao hash da descrição,
+        para ser reaproveitado por todos os termos (e por reposts com a mesma descrição).
+        """
+        chave = hash_descricao(descricao_completa)
+        try:
+            with self._lock, self.con:
+                self.con.execute(
+                    "INSERT OR IGNORE INTO resumos_ia (hash_descricao, resumo_ia, criado_em) VALUES (?, ?, ?)",
+                    (chave, resumo_ia, time.time())
+                )
+                self.con.execute("UPDATE vagas SET hash_descricao = ? WHERE vagas_id = ?", (chave, vagas_id))
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao salvar resumo da vaga: {e}")
+
+    @cronometrado('db')
+    def busca_similar(self, vagas_id, assinatura, distancia_maxima=SIMHASH_DISTANCIA_MAXIMA):
+        """
+        Vaga já indexada mais parecida com a assinatura, se estiver a até `distancia_maxima` bits.
+        Só são comparadas as vagas que coincidem com a assinatura em alguma banda inteira (LSH):
+        com SIMHASH_BANDAS > distancia_maxima, toda vaga dentro da distância cai em ao menos uma banda.
+        """
+        condicao = ' OR '.join(f"banda_{banda} = ?" for banda in range(SIMHASH_BANDAS))
+        with self._lock:
+            candidatos = self.con.execute(
+                f"SELECT vagas_id, simhash, grupo FROM assinaturas_vagas WHERE ({condicao}) AND vagas_id != ?",
+                (*bandas_simhash(assinatura), vagas_id)
+            ).fetchall()
+        if not candidatos:
+            return None
+        distancia, candidato = min(((distancia_hamming(assinatura, c['simhash']), c) for c in candidatos), key=lambda par: par[0])
+        if distancia > distancia_maxima:
+            return None
+        return {'vagas_id': candidato['vagas_id'], 'grupo': candidato['grupo'], 'distancia': distancia}
+
+    @cronometrado('db')
+    def salva_assinatura(self, vagas_id, assinatura, grupo):
+        """Indexa a assinatura SimHash da vaga (gravada com sinal, como o INTEGER do SQLite exige)."""
+        com_sinal = assinatura - (1 << 64) if assinatura >= 1 << 63 else assinatura
+        colunas = ''.join(f"banda_{banda}, " for banda in range(SIMHASH_BANDAS))
+        try:
+            with self._lock, self.con:
+                self.con.execute(
+                    f"INSERT OR REPLACE INTO assinaturas_vagas (vagas_id, simhash, {colunas}grupo) "
+                    f"VALUES (?, ?, {'?, ' * SIMHASH_BANDAS}?)",
+                    (vagas_id, com_sinal, *bandas_simhash(assinatura), grupo)
+                )
+        except sqlite3.Error as e:
+            logging.error(f" [DB] Erro ao salvar assinatura da vaga: {e}")
+
+    @cronometrado('db')
+    def grupo_ja_alertado(self, grupo, busca_termo):
+        """
+        Checa se alguma vaga do grupo de quase-duplicatas já foi registrada (e alertada) para o termo,
+        inclusive as já notificadas que ainda aguardam a persistência no pipeline.
+        """
+        with self._lock:
+            cur = self.con.execute("""
+                SELECT EXISTS (
+                    SELECT 1 FROM assinaturas_vagas a
+                    JOIN vagas_encontradas e ON e.vagas_id = a.vagas_id AND e.busca_termo = :termo
+                    WHERE a.grupo = :grupo
+                ) OR EXISTS (
+                    SELECT 1 FROM assinaturas_vagas a
+                    JOIN pipeline_vagas p ON p.vagas_id = a.vagas_id AND p.busca_termo = :termo AND p.estado = 'notificada'
+                    WHERE a.grupo = :grupo
+                )
+            """, {'termo': busca_termo, 'grupo': grupo})
+            return bool(cur.fetchone()[0])
+
+    def vagas_recentes(self, busca_termo=None, empresa=None, dias=None, limite=50):
+        """
+        Vagas encontradas mais recentemente, da mais nova para a mais antiga, filtradas por termo
+        (exato), empresa (sem distinção de maiúsculas) e/ou pelos últimos `dias` dias.
+        Cada filtro é atendido por um índice, então nenhuma combinação varre o histórico inteiro.
+        """
+        condicoes, parametros = [], []
+        if busca_termo is not None:
+            condicoes.append("e.busca_termo = ?")
+            parametros.append(busca_termo)
+        if empresa is not None:
+            condicoes.append("v.empresa = ? COLLATE NOCASE")
+            parametros.append(empresa)
+        if dias is not None:
+            condicoes.append("e.data_extracao >= datetime('now', ?)")
+            parametros.append(f"-{dias} days")
+        filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        with self._lock:
+            cur = self.con.execute(f"""
+                SELECT e.data_extracao, e.busca_termo, v.vagas_id, v.titulo, v.empresa, v.localizacao,
+                       v.salario, v.modalidade, v.url_vaga
+                FROM vagas_encontradas e JOIN vagas v ON v.vagas_id = e.vagas_id
+                {filtro}
+                ORDER BY e.data_extracao DESC
+                LIMIT ?
+            """, (*parametros, limite))
+            return [dict(linha) for linha in cur]
+
+    def aplica_retencao(self, caminho_arquivo=DB_ARQUIVO_NOME, dias_descricao=RETENCAO_DESCRICAO_DIAS,
+                        dias_historico=RETENCAO_HISTORICO_DIAS):
+        """
+        Política de retenção do histórico (None desliga a etapa):
+           - compactação: vagas não vistas há `dias_descricao` dias perdem descrição e exigências.
+             O hash fica, então o resumo continua ligado e uma descrição alterada ainda é detectada.
+           - arquivamento: vínculos termo -> vaga mais antigos que `dias_historico` dias vão para o
+             banco `caminho_arquivo`, junto das vagas que ficaram sem vínculo e dos resumos que
+             nenhuma vaga usa mais.
+        Retorna quantas linhas cada etapa afetou.
+        """
+        totais = dict.fromkeys(('descricoes_compactadas', 'vinculos_arquivados', 'vagas_arquivadas', 'resumos_arquivados'), 0)
+        try:
+            if dias_descricao is not None:
+                with self._lock, self.con:
+                    totais['descricoes_compactadas'] = self.con.execute("""
+                        UPDATE vagas SET descricao_completa = NULL, exigencias = NULL
+                        WHERE descricao_completa IS NOT NULL
+                          AND atualizado_em < :limite
+                          AND NOT EXISTS (
+                              SELECT 1 FROM vagas_encontradas e
+                              WHERE e.vagas_id = vagas.vagas_id AND e.data_extracao >= datetime(:limite, 'unixepoch')
+                          )
+                    """, {'limite': time.time() - dias_descricao * 86400}).rowcount
+            if dias_historico is not None:
+                self._arquiva(caminho_arquivo, time.time() - dias_historico * 86400, totais)
+        except sqlite3.Error as e:
+            logging.error(f" [DB RETENÇÃO] Erro ao aplicar a retenção: {e}")
+        logging.info(" [DB RETENÇÃO] " + ", ".join(f"{nome}={total}" for nome, total in totais.items()))
+        return totais
+
+    def _arquiva(self, caminho_arquivo, limite, totais):
+        """
+        Move para o banco de arquivo o histórico anterior a `limite` (epoch), em lotes de RETENCAO_LOTE
+        vínculos, cada um em sua própria transação, para não segurar o banco durante os ciclos.
+        """
+        with self._lock:
+            self.con.execute("ATTACH DATABASE ? AS arquivo", (caminho_arquivo,))
+        try:
+            with self._lock, self.con:
+                self.con.execute(self.DDL_VAGAS.format(tabela='arquivo.vagas'))
+                self.con.execute("""
+                    CREATE TABLE IF NOT EXISTS arquivo.vagas_encontradas (
+                        vagas_id TEXT NOT NULL,
+                        busca_termo TEXT NOT NULL,
+                        data_extracao TIMESTAMP,
+                        arquivado_em REAL NOT NULL
+                    )
+                """)
+                self.con.execute("""
+                    CREATE TABLE IF NOT EXISTS arquivo.resumos_ia (
+                        hash_descricao TEXT PRIMARY KEY,
+                        resumo_ia TEXT NOT NULL,
+                        criado_em REAL NOT NULL
+                    )
+                """)
+                colunas_arquivo = {linha[1] for linha in self.con.execute("PRAGMA arquivo.table_info(vagas)")}
+                colunas = ', '.join(
+                    linha[1] for linha in self.con.execute("PRAGMA main.table_info(vagas)") if linha[1] in colunas_arquivo
+                )
+
+            limite_texto = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(limite))
+            while True:
+                with self._lock, self.con:
+                    lote = self.con.execute("""
+                        SELECT vagas_id, busca_termo, data_extracao FROM vagas_encontradas
+                        WHERE data_extracao < ? ORDER BY data_extracao LIMIT ?
+                    """, (limite_texto, RETENCAO_LOTE)).fetchall()
+                    agora = time.time()
+                    self.con.executemany(
+                        "INSERT INTO arquivo.vagas_encontradas (vagas_id, busca_termo, data_extracao, arquivado_em) VALUES (?, ?, ?, ?)",
+                        [(*linha, agora) for linha in lote]
+                    )
+                    self.con.executemany(
+                        "DELETE FROM vagas_encontradas WHERE vagas_id = ? AND busca_termo = ?",
+                        [(linha[0], linha[1]) for linha in lote]
+                    )
+
+                    sem_vinculo = "NOT EXISTS (SELECT 1 FROM vagas_encontradas e WHERE e.vagas_id = vagas.vagas_id)"
+                    ids = [(vagas_id,) for vagas_id in {linha[0] for linha in lote}]
+                    self.con.executemany(
+                        f"INSERT OR REPLACE INTO arquivo.vagas ({colunas}) SELECT {colunas} FROM vagas WHERE vagas_id = ? AND {sem_vinculo}",
+                        ids
+                    )
+                    totais['vagas_arquivadas'] += self.con.executemany(
+                        f"DELETE FROM vagas WHERE vagas_id = ? AND {sem_vinculo}", ids
+                    ).rowcount
+                    self.con.executemany("""
+                        DELETE FROM assinaturas_vagas WHERE vagas_id = ?
+                          AND NOT EXISTS (SELECT 1 FROM vagas v WHERE v.vagas_id = assinaturas_vagas.vagas_id)
+                    """, ids)
+                totais['vinculos_arquivados'] += len(lote)
+                if len(lote) < RETENCAO_LOTE:
+                    break
+
+            with self._lock, self.con:
+                sem_uso = """
+                    criado_em < ? AND NOT EXISTS (SELECT 1 FROM vagas v WHERE v.hash_descricao = resumos_ia.hash_descricao)
+                """
+                self.con.execute(
+                    f"INSERT OR IGNORE INTO arquivo.resumos_ia SELECT hash_descricao, resumo_ia, criado_em FROM resumos_ia WHERE {sem_uso}",
+                    (limite,)
+                )
+                totais['resumos_arquivados'] = self.con.execute(f"DELETE FROM resumos_ia WHERE {sem_uso}", (limite,)).rowcount
+        finally:
+            with self._lock:
+                self.con.execute("DETACH DATABASE arquivo")
+
+    def libera_espaco(self):
+        """Reescreve o arquivo do banco (VACUUM), devolvendo ao disco as páginas liberadas pela retenção."""
+        with self._lock:
+            self.con.execute("VACUUM")
+
+    @cronometrado('db')
+    def normaliza_vagas(self, lote=NORMALIZACAO_LOTE):
+        """
+        Etapa de normalização, em blocos de `lote` vagas: converte salário (mínimo/máximo/período),
+        modalidade e cidade/UF das vagas novas ou alteradas desde a última passada, achadas pelo
+        índice parcial idx_vagas_a_normalizar. normalizado_em recebe o atualizado_em lido, então uma
+        vaga regravada durante o bloco volta a ser normalizada. Retorna quantas vagas foram normalizadas.
+        """
+        total = 0
+        while True:
+            with self._lock:
+                linhas = self.con.execute("""
+                    SELECT vagas_id, salario, localizacao, modalidade, atualizado_em FROM vagas
+                    WHERE normalizado_em IS NULL OR normalizado_em < atualizado_em
+                    LIMIT ?
+                """, (lote,)).fetchall()
+            if not linhas:
+                return total
+            parametros = [
+                (*normaliza_campos_vaga(linha['salario'], linha['localizacao'], linha['modalidade']),
+                 linha['atualizado_em'], linha['vagas_id'])
+                for linha in linhas
+            ]
+            with self._lock, self.con:
+                self.con.executemany("""
+                    UPDATE vagas SET salario_min = ?, salario_max = ?, salario_periodo = ?, modalidade_normalizada = ?,
+                                     cidade = ?, uf = ?, normalizado_em = ?
+                    WHERE vagas_id = ?
+                """, parametros)
+            total += len(linhas)
+
+    def atualiza_agregados(self, janela_dias=AGREGADOS_JANELA_DIAS):
+        """
+        Normaliza as vagas pendentes e recalcula a tabela agregados_termo com os últimos `janela_dias` dias
+        de cada termo: vagas na janela, vagas por dia (mesma taxa do agendador), salário mensal mediano
+        (ponto médio da faixa), contagem por modalidade e cidade mais frequente. Painéis e relatórios leem
+        só essa tabela, sem varrer o histórico. Retorna quantos termos foram agregados.
+        """
+        self.normaliza_vagas()
+        janela = f"-{janela_dias} days"
+        with self._lock:
+            termos = [linha[0] for linha in self.con.execute(
+                "SELECT busca_termo FROM marcas_termo UNION SELECT DISTINCT busca_termo FROM vagas_encontradas"
+            )]
+            contagens = {linha['busca_termo']: linha for linha in self.con.execute("""
+                SELECT e.busca_termo, COUNT(*) AS vagas_janela,
+                       SUM(v.modalidade_normalizada IS 'presencial') AS presencial,
+                       SUM(v.modalidade_normalizada IS 'hibrido') AS hibrido,
+                       SUM(v.modalidade_normalizada IS 'remoto') AS remoto
+                FROM vagas_encontradas e LEFT JOIN vagas v ON v.vagas_id = e.vagas_id
+                WHERE e.data_extracao >= datetime('now', ?)
+                GROUP BY e.busca_termo
+            """, (janela,))}
+            salarios = {}
+            for termo, salario in self.con.execute("""
+                SELECT e.busca_termo, (COALESCE(v.salario_min, v.salario_max) + v.salario_max) / 2
+                FROM vagas_encontradas e JOIN vagas v ON v.vagas_id = e.vagas_id
+                WHERE e.data_extracao >= datetime('now', ?) AND v.salario_periodo = 'mes'
+            """, (janela,)):
+                salarios.setdefault(termo, []).append(salario)
+            cidades = {linha[0]: linha[1] for linha in self.con.execute("""
+                SELECT busca_termo, cidade, MAX(quantidade) FROM (
+                    SELECT e.busca_termo, v.cidade, COUNT(*) AS quantidade
+                    FROM vagas_encontradas e JOIN vagas v ON v.vagas_id = e.vagas_id
+                    WHERE e.data_extracao >= datetime('now', ?) AND v.cidade IS NOT NULL
+                    GROUP BY e.busca_termo, v.cidade
+                ) GROUP BY busca_termo
+            """, (janela,))}
+
+        agora = time.time()
+        linhas = []
+        for termo in termos:
+            contagem = contagens.get(termo)
+            salarios_termo = salarios.get(termo, [])
+            linhas.append((
+                termo, janela_dias, contagem['vagas_janela'] if contagem else 0,
+                self.taxa_chegada(termo, janela_dias) * 86400, len(salarios_termo),
+                statistics.median(salarios_termo) if salarios_termo else None,
+                contagem['presencial'] if contagem else 0, contagem['hibrido'] if contagem else 0,
+                contagem['remoto'] if contagem else 0, cidades.get(termo), agora,
+            ))
+        with self._lock, self.con:
+            self.con.execute("DELETE FROM agregados_termo")
+            self.con.executemany("INSERT INTO agregados_termo VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+        logging.info(f" [AGREGADOS] Indicadores de {len(linhas)} termos recalculados (janela de {janela_dias:g} dias).")
+        return len(linhas)
+
+    def agregados(self, busca_termo=None):
+        """Indicadores pré-calculados por termo (tabela agregados_termo), para painéis e relatórios."""
+        with self._lock:
+            cur = self.con.execute(
+                "SELECT * FROM agregados_termo WHERE ? IS NULL OR busca_termo = ? ORDER BY busca_termo",
+                (busca_termo, busca_termo)
+            )
+            return [dict(linha) for linha in cur]
+
+    def itera_historico(self, busca_termo=None, dias=None, lote=EXPORTACAO_LOTE):
+        """
+        Percorre o histórico (vínculo termo -> vaga, com os dados e os campos normalizados da vaga) em
+        blocos de `lote` linhas, paginando pelo rowid: o lock só é segurado durante cada bloco e a
+        memória não cresce com a tabela.
+        """
+        colunas = ', '.join(
+            f"e.{nome}" if nome in ('data_extracao', 'busca_termo', 'vagas_id') else f"v.{nome}"
+            for nome, _ in self.COLUNAS_EXPORTACAO
+        )
+        parametros = {'termo': busca_termo, 'janela': f"-{dias} days" if dias is not None else None, 'lote': lote, 'ultimo': 0}
+        while True:
+            with self._lock:
+                linhas = self.con.execute(f"""
+                    SELECT e.rowid AS posicao, {colunas}
+                    FROM vagas_encontradas e LEFT JOIN vagas v ON v.vagas_id = e.vagas_id
+                    WHERE e.rowid > :ultimo
+                      AND (:termo IS NULL OR e.busca_termo = :termo)
+                      AND (:janela IS NULL OR e.data_extracao >= datetime('now', :janela))
+                    ORDER BY e.rowid
+                    LIMIT :lote
+                """, parametros).fetchall()
+            if not linhas:
+                return
+            parametros['ultimo'] = linhas[-1]['posicao']
+            yield [{nome: linha[nome] for nome, _ in self.COLUNAS_EXPORTACAO} for linha in linhas]
+
+class CacheRespostasHTTP:
+    """
+    Cache persistente de respostas HTTP por URL (arquivo SQLite próprio, DB_RESPOSTAS_NOME).
+    - Guarda o corpo comprimido (zlib), os validadores (ETag/Last-Modified), o hash do corpo e
+      o resultado já extraído da página, para que uma página inalterada não seja analisada de novo.
+    - O resultado vem marcado com o extrator que o produziu (função + backend de parser); se o
+      extrator mudar, a página inalterada é extraída de novo a partir do corpo guardado, sem requisição.
+    - Despejo por idade (CACHE_RESPOSTAS_MAX_IDADE sem acesso) e por tamanho total
+      (CACHE_RESPOSTAS_MAX_MB, removendo primeiro as menos acessadas recentemente).
+    """
+
+    def __init__(self, caminho=DB_RESPOSTAS_NOME, max_bytes=CACHE_RESPOSTAS_MAX_MB * 1024 * 1024,
+                 max_idade=CACHE_RESPOSTAS_MAX_IDADE):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.max_idade = max_idade
+        self.con = sqlite3.connect(caminho, check_same_thread=False)
+        self.con.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        for pragma in RepositorioVagas.PRAGMAS:
+            self.con.execute(pragma)
+        with self._lock, self.con:
+            self.con.execute('''
+                CREATE TABLE IF NOT EXISTS respostas_http (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    hash_corpo TEXT NOT NULL,
+                    corpo BLOB NOT NULL,
+                    extraido TEXT,
+                    extrator TEXT,
+                    tamanho INTEGER NOT NULL,
+                    atualizado_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+            ''')
+            self.con.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas_http (acessado_em)")
+            if 'extrator' not in {linha[1] for linha in self.con.execute("PRAGMA table_info(respostas_http)")}:
+                self.con.execute("ALTER TABLE respostas_http ADD COLUMN extrator TEXT")
+        self.tamanho_total = self._calcula_tamanho_total()
 
-def verifica_vaga_existe(vagas_id, busca_termo):
-    """Verifica se a vaga já existe no DB para o termo de busca específico."""
-    con = sqlite3.connect(DB_VAGAS_NOME)
-    cur = con.cursor()
-    cur.execute("SELECT 1 FROM vagas_encontradas WHERE vagas_id = ? AND busca_termo = ?", (vagas_id, busca_termo))
-    existe = cur.fetchone() is not None
-    con.close()
-    return existe
-
-def has_data_for_term(search_term):
-    """Checa se já há dados salvos para um termo de busca específico."""
-    con = sqlite3.connect(DB_VAGAS_NOME)
-    cur = con.cursor()
-    cur.execute("SELECT COUNT(*) FROM vagas_encontradas WHERE busca_termo = ?", (search_term,))
-    count = cur.fetchone()[0]
-    con.close()
-    return count > 0
+    def fechar(self):
+        with self._lock:
+            self.con.close()
+
+    def _calcula_tamanho_total(self):
+        with self._lock:
+            return self.con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas_http").fetchone()[0]
+
+    @cronometrado('db')
+    def busca(self, url):
+        with self._lock:
+            return self.con.execute(
+                "SELECT etag, last_modified, hash_corpo, extraido, extrator FROM respostas_http WHERE url = ?", (url,)
+            ).fetchone()
+
+    @cronometrado('db')
+    def corpo(self, url):
+        """Corpo descomprimido da última resposta guardada para a URL (ou None)."""
+        with self._lock:
+            row = self.con.execute("SELECT corpo FROM respostas_http WHERE url = ?", (url,)).fetchone()
+        return zlib.decompress(row['corpo']).decode('utf-8') if row else None
+
+    @cronometrado('db')
+    def toca(self, url):
+        with self._lock, self.con:
+            self.con.execute("UPDATE respostas_http SET acessado_em = ? WHERE url = ?", (time.time(), url))
+
+    @cronometrado('db')
+    def atualiza_validadores(self, url, etag, last_modified):
+        """Guarda os validadores de uma resposta 200 com o mesmo conteúdo, para que a próxima busca possa voltar 304."""
+        with self._lock, self.con:
+            self.con.execute(
+                "UPDATE respostas_http SET etag = ?, last_modified = ?, acessado_em = ? WHERE url = ?",
+                (etag, last_modified, time.time(), url)
+            )
+
+    @cronometrado('db')
+    def atualiza_extraido(self, url, extraido, extrator):
+        """Troca o resultado guardado pelo de um novo extrator (página inalterada, corpo reaproveitado)."""
+        with self._lock, self.con:
+            self.con.execute(
+                "UPDATE respostas_http SET extraido = ?, extrator = ?, acessado_em = ? WHERE url = ?",
+                (json.dumps(extraido), extrator, time.time(), url)
+            )
+
+    @cronometrado('db')
+    def salva(self, url, corpo, hash_corpo, extraido, extrator, etag=None, last_modified=None):
+        comprimido = zlib.compress(corpo.encode('utf-8'), 6)
+        agora = time.time()
+        with self._lock, self.con:
+            anterior = self.con.execute("SELECT tamanho FROM respostas_http WHERE url = ?", (url,)).fetchone()
+            self.con.execute('''
+                INSERT INTO respostas_http (url, etag, last_modified, hash_corpo, corpo, extraido, extrator, tamanho, atualizado_em, acessado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    etag = excluded.etag, last_modified = excluded.last_modified, hash_corpo = excluded.hash_corpo,
+                    corpo = excluded.corpo, extraido = excluded.extraido, extrator = excluded.extrator,
+                    tamanho = excluded.tamanho, atualizado_em = excluded.atualizado_em, acessado_em = excluded.acessado_em
+            ''', (url, etag, last_modified, hash_corpo, comprimido, json.dumps(extraido), extrator, len(comprimido), agora, agora))
+            self.tamanho_total += len(comprimido) - (anterior['tamanho'] if anterior else 0)
+        self.despeja()
+
+    def despeja(self):
+        """Remove respostas sem acesso há mais de max_idade e, se ainda preciso, as menos usadas até caber em max_bytes."""
+        with self._lock, self.con:
+            removidas = self.con.execute(
+                "DELETE FROM respostas_http WHERE acessado_em < ?", (time.time() - self.max_idade,)
+            ).rowcount
+            if removidas:
+                self.tamanho_total = self._calcula_tamanho_total()
+            if self.tamanho_total <= self.max_bytes:
+                return
+
+            excesso = self.tamanho_total - self.max_bytes
+            urls = []
+            for row in self.con.execute("SELECT url, tamanho FROM respostas_http ORDER BY acessado_em"):
+                urls.append(row['url'])
+                excesso -= row['tamanho']
+                if excesso <= 0:
+                    break
+            self.con.executemany("DELETE FROM respostas_http WHERE url = ?", [(url,) for url in urls])
+            self.tamanho_total = self._calcula_tamanho_total()
+            logging.info(f" [CACHE HTTP] {len(urls)} respostas despejadas para manter o cache em {self.max_bytes // (1024 * 1024)} MB.")
 
 def fetch_clients():
     """Lê os termos de busca (role) do clientes.db. Cria mock se o DB não existir."""
@@ -227,270 +1915,1641 @@ def fetch_clients():
              logging.error(f"Falha ao criar DB mock: {create_e}")
              return []
 
+def fetch_perfis():
+    """
+    Lê os perfis de relevância do clientes.db como {cliente_id: {palavra: peso}}.
+    Cria a tabela perfil_cliente (vazia) se ela ainda não existir.
+    """
+    try:
+        con = sqlite3.connect(DB_CLIENTES_NOME)
+        with con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS perfil_cliente (
+                    cliente_id INTEGER NOT NULL,
+                    palavra TEXT NOT NULL,
+                    peso REAL NOT NULL DEFAULT 1,
+                    PRIMARY KEY (cliente_id, palavra)
+                )
+            """)
+        linhas = con.execute("SELECT cliente_id, palavra, peso FROM perfil_cliente").fetchall()
+        con.close()
+    except sqlite3.Error as e:
+        logging.error(f" [DB CLIENTES] Falha ao ler os perfis de relevância: {e}")
+        return {}
+
+    perfis = {}
+    for cliente_id, palavra, peso in linhas:
+        palavra = normaliza_texto_relevancia(palavra)
+        if palavra:
+            perfis.setdefault(cliente_id, {})[palavra] = peso
+    return perfis
+
+def normaliza_texto_relevancia(texto):
+    """Caixa, acentos e espaços normalizados, para que 'Gestão  de Projetos' case com 'gestao de projetos'."""
+    sem_acentos = ''.join(c for c in unicodedata.normalize('NFKD', texto or '') if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.split()).casefold()
+
+class PerfilRelevancia:
+    """
+    Perfil de palavras-chave/skills de um termo, compilado em uma única regex com todas as palavras:
+    uma passada pelo título e outra pela descrição pontuam e marcam a vaga, sem chamar a IA.
+    Palavras no título valem RELEVANCIA_PESO_TITULO vezes o peso; pesos negativos penalizam.
+    """
+
+    def __init__(self, pesos):
+        self.pesos = pesos
+        alternativas = '|'.join(re.escape(palavra) for palavra in sorted(pesos, key=len, reverse=True))
+        self.padrao = re.compile(rf'(?<!\w)(?:{alternativas})(?!\w)')
+
+    @cronometrado('parse')
+    def avalia(self, details):
+        """Retorna (pontuação, palavras encontradas da mais para a menos pesada)."""
+        titulo = normaliza_texto_relevancia(details.get('titulo'))
+        corpo = normaliza_texto_relevancia(f"{details.get('descricao_completa') or ''} {details.get('exigencias') or ''}")
+        no_titulo = set(self.padrao.findall(titulo))
+        encontradas = no_titulo | set(self.padrao.findall(corpo))
+        pontuacao = sum(
+            self.pesos[palavra] * (RELEVANCIA_PESO_TITULO if palavra in no_titulo else 1) for palavra in encontradas
+        )
+        return pontuacao, sorted(encontradas, key=lambda palavra: (-self.pesos[palavra], palavra))
+
+def carrega_perfis_relevancia(clients, perfis):
+    """
+    Compila um PerfilRelevancia por termo, juntando as palavras de todos os clientes que buscam o
+    mesmo role (vale o maior peso). Termos sem nenhum perfil ficam de fora: todas as suas vagas vão para a IA.
+    """
+    pesos_por_termo = {}
+    for client_id, _, search_term in clients:
+        if not search_term or client_id not in perfis:
+            continue
+        pesos = pesos_por_termo.setdefault(normaliza_termo(search_term), {})
+        for palavra, peso in perfis[client_id].items():
+            pesos[palavra] = max(peso, pesos.get(palavra, peso))
+    return {chave: PerfilRelevancia(pesos) for chave, pesos in pesos_por_termo.items()}
+
+def resumo_por_modelo(details, pontuacao, tags):
+    """Resumo local, sem IA, das vagas que ficaram abaixo do limiar de relevância do perfil."""
+    topicos = [f"Relevância baixa para o perfil ({pontuacao:g} pts). Resumo automático, sem análise de IA."]
+    topicos.append("Palavras do perfil: " + (", ".join(tags) if tags else "nenhuma encontrada."))
+    exigencias = details.get('exigencias')
+    if exigencias and exigencias != 'N/A':
+        topicos.append("Exigências: " + (exigencias if len(exigencias) <= 300 else exigencias[:297] + "..."))
+    return "\n\n".join(topicos)
+
+NUMERO_SALARIO = r'\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:,\d{1,2})?'
+PADRAO_SALARIO = re.compile(rf'r\$\s*({NUMERO_SALARIO})(?:\s*(?:-|a|ate)\s*(?:r\$\s*)?({NUMERO_SALARIO}))?')
+PERIODOS_SALARIO = (
+    ('hora', re.compile(r'\bhora\b|\bpor h\b')),
+    ('dia', re.compile(r'\bdia\b|\bdiaria\b')),
+    ('ano', re.compile(r'\bano\b|\banual\b')),
+)
+MODALIDADES = (
+    ('hibrido', ('hibrid',)),
+    ('remoto', ('home office', 'remot', 'teletrabalho', 'a distancia')),
+    ('presencial', ('presencial',)),
+)
+PADRAO_CIDADE_UF = re.compile(r'^(.+?)\s*[-/,]\s*([A-Za-z]{2})$')
+UFS = frozenset((
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+))
+
+def valor_salario(texto):
+    """'1.500,00' -> 1500.0"""
+    return float(texto.replace('.', '').replace(',', '.'))
+
+def normaliza_salario(texto):
+    """
+    Faixa salarial em números: 'R$ 1.500,00 - R$ 2.000,00 (Bruto mensal)' -> (1500.0, 2000.0, 'mes').
+    'Até R$ 3.000,00' só tem máximo; sem valor ('A combinar', 'N/A') -> (None, None, None).
+    O período é o mês, salvo menção a hora, dia ou ano.
+    """
+    normalizado = normaliza_texto_relevancia(texto)
+    match = PADRAO_SALARIO.search(normalizado)
+    if not match:
+        return None, None, None
+    minimo = valor_salario(match.group(1))
+    maximo = valor_salario(match.group(2)) if match.group(2) else minimo
+    if not match.group(2) and re.search(r'\bate\s*$', normalizado[:match.start()]):
+        minimo = None
+    periodo = next((periodo for periodo, padrao in PERIODOS_SALARIO if padrao.search(normalizado)), 'mes')
+    return minimo, maximo, periodo
+
+def normaliza_modalidade(texto):
+    """'Home office', '100% Remoto' -> 'remoto'; 'Híbrido' -> 'hibrido'; 'Presencial' -> 'presencial'; senão None."""
+    normalizado = normaliza_texto_relevancia(texto)
+    for modalidade, indicios in MODALIDADES:
+        if any(indicio in normalizado for indicio in indicios):
+            return modalidade
+    return None
+
+def normaliza_localizacao(texto):
+    """'São Paulo - SP' -> ('São Paulo', 'SP'); só a cidade (página de detalhe) -> ('São Paulo', None)."""
+    texto = ' '.join((texto or '').split())
+    if not texto or texto == 'N/A':
+        return None, None
+    match = PADRAO_CIDADE_UF.match(texto)
+    if match and match.group(2).upper() in UFS:
+        return match.group(1), match.group(2).upper()
+    return texto, None
+
+def normaliza_campos_vaga(salario, localizacao, modalidade):
+    """Campos normalizados da vaga: (salario_min, salario_max, salario_periodo, modalidade_normalizada, cidade, uf)."""
+    return (*normaliza_salario(salario), normaliza_modalidade(modalidade), *normaliza_localizacao(localizacao))
+
 def extract_infojobs_id(link):
     """Extrai o ID numérico da vaga do final da URL Infojobs."""
     match = re.search(r'__(\d+)\.aspx', link) 
     if match: return match.group(1).strip()
     return 'N/A'
 
-def realizar_tentativa_resgate(soup, tipo_tentativa):
-    """Executa a coleta de links com a lógica resiliente."""
-    links_encontrados = []
-    
-    if tipo_tentativa == 1:
-        elementos = soup.find_all('div', attrs={'data-id': True})
-        for elem in elementos:
-            link_tag = elem.find('a', class_='text-decoration-none', href=True)
-            if link_tag: links_encontrados.append(urljoin(URL_BASE, link_tag['href']))
-    elif tipo_tentativa == 2:
-        elementos = soup.find_all('a', class_='text-decoration-none', href=True)
-        for link_tag in elementos:
-            if '/vaga-de-' in link_tag['href']: links_encontrados.append(urljoin(URL_BASE, link_tag['href']))
-    elif tipo_tentativa == 3:
-        elementos = soup.find_all('h2', class_='h3 font-weight-bold text-body mb-2')
-        for h2_tag in elementos:
-            link_tag = h2_tag.find_parent('a', href=True)
-            if link_tag and '/vaga-de-' in link_tag['href']: links_encontrados.append(urljoin(URL_BASE, link_tag['href']))
-
-    return list(set(links_encontrados)) 
-
-def fetch_page_infojobs(url, headers, retries=MAX_RETRIES):
-    """Tenta acessar a página do Infojobs com loop de retry em caso de falha de rede/conexão."""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status() 
-            return response.text
-        except requests.RequestException as e:
-            logging.warning(f" [RETRY] Falha de conexão na tentativa {attempt + 1} para {url}: {str(e)}")
-        
-        if attempt < retries - 1:
-             time.sleep(RETRY_DELAY)
-             
-    logging.error(f"❌ Falha crítica de rede/servidor após {retries} tentativas para {url}.")
-    return None
+MARCADOR_CARD_VAGA = 'card card-shadow px-32 py-20'
+MARCADOR_RESULTADOS_BUSCA = 'data-id='
+CAMPOS_ESSENCIAIS_CARD = ('titulo', 'empresa', 'localizacao')
 
+def recorta_html(html_content, marcador):
+    """
+    Descarta tudo o que vem antes da tag que contém o marcador, para que o parser
+    processe só a subárvore de interesse. Sem o marcador, devolve o HTML inteiro.
+    """
+    posicao = html_content.find(marcador)
+    if posicao == -1:
+        return html_content
+    inicio = html_content.rfind('<', 0, posicao)
+    return html_content[inicio:] if inicio != -1 else html_content
 
-def coletar_links_por_termo(search_term):
-    """Busca links no Infojobs para um termo, usando lógica resiliente com retry."""
-    
-    encoded_term = quote_plus(search_term) 
-    url_busca = URL_TEMPLATE + encoded_term
-    
-    time.sleep(RETRY_DELAY) 
-    
-    simple_search_headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36', 
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-        'Referer': 'https://www.google.com/',
-        'Accept-Language': 'pt-BR,pt;q=0.9',
-    }
-    
-    html_content = fetch_page_infojobs(url_busca, simple_search_headers, retries=MAX_RETRIES) 
-    
-    if not html_content:
-        return []
+def escolhe_links_resgate(candidatos):
+    """
+    Aplica as três tentativas de resgate de links em uma única passada sobre os <a href>:
+       1. primeiro link .text-decoration-none de cada card com data-id;
+       2. links .text-decoration-none que apontam para '/vaga-de-';
+       3. links '/vaga-de-' que envolvem o título (h2) do card.
+    Fica com a tentativa mais produtiva, mantendo a ordem da página.
+    `candidatos` são tuplas (href, tem_classe_link, card, tem_titulo).
+    """
+    tentativas = ([], [], [])
+    cards_vistos = set()
+    for href, tem_classe_link, card, tem_titulo in candidatos:
+        link = urljoin(URL_BASE, href)
+        eh_vaga = '/vaga-de-' in href
+        if tem_classe_link:
+            if card is not None and card not in cards_vistos:
+                cards_vistos.add(card)
+                tentativas[0].append(link)
+            if eh_vaga:
+                tentativas[1].append(link)
+        if tem_titulo and eh_vaga:
+            tentativas[2].append(link)
 
-    soup = BeautifulSoup(html_content, 'html.parser')
     links_finais = []
-    for i in range(1, 4):
-        links_tentativa = realizar_tentativa_resgate(soup, i)
+    for links_tentativa in tentativas:
+        links_tentativa = list(dict.fromkeys(links_tentativa))
         if len(links_tentativa) > len(links_finais):
             links_finais = links_tentativa
-    
     return links_finais
 
-def extrair_dados_vaga_em_tempo_real(url, is_initial_run=False):
+
+class ParserBS4:
+    """Backend BeautifulSoup (usa o parser lxml do bs4 quando instalado, senão html.parser)."""
+
+    nome = 'bs4'
+
+    def __init__(self, features=None):
+        self.features = features or ('lxml' if lxml_html is not None else 'html.parser')
+
+    def candidatos_links(self, html_content):
+        soup = BeautifulSoup(html_content, self.features)
+        for link_tag in soup.find_all('a', href=True):
+            card = link_tag.find_parent('div', attrs={'data-id': True})
+            yield (
+                link_tag['href'],
+                'text-decoration-none' in (link_tag.get('class') or []),
+                id(card) if card is not None else None,
+                link_tag.find('h2', class_='h3 font-weight-bold text-body mb-2') is not None,
+            )
+
+    def cards_busca(self, html_content):
+        soup = BeautifulSoup(html_content, self.features)
+        cards = []
+        for card in soup.find_all('div', attrs={'data-id': True}):
+            link_tag = card.find('a', class_='text-decoration-none', href=True)
+            titulo_tag = card.find('h2', class_='h3 font-weight-bold text-body mb-2')
+            empresa_tag = card.find('div', class_='text-body text-medium mb-8')
+            local_tag = card.find('div', class_='small text-medium mb-8')
+            salario_tag = card.find('span', class_='icon-money')
+            modalidade_tag = card.find('span', class_='icon-location')
+            cards.append({
+                'href': link_tag['href'] if link_tag else None,
+                'titulo': titulo_tag.text if titulo_tag else None,
+                'empresa': empresa_tag.text if empresa_tag else None,
+                'local': local_tag.text if local_tag else None,
+                'salario': salario_tag.parent.text if salario_tag else None,
+                'modalidade': modalidade_tag.parent.text if modalidade_tag else None,
+            })
+        return cards
+
+    def campos_card(self, html_content):
+        soup = BeautifulSoup(html_content, self.features, parse_only=SoupStrainer('div', class_=MARCADOR_CARD_VAGA))
+        card_principal = soup.find('div', class_=MARCADOR_CARD_VAGA)
+        if not card_principal:
+            return None
+
+        painel = card_principal.find('div', class_='pt-24 text-medium js_vacancyDataPanels js_applyVacancyHidden')
+        descricao_p = painel.find('p', class_='mb-16 text-break white-space-pre-line') if painel else None
+        exigencias_ul = painel.find('ul', class_='custom-list') if painel else None
+        titulo_tag = card_principal.find('h2', class_='js_vacancyHeaderTitle')
+        empresa_tag = card_principal.find('div', class_='h4')
+        modalidade_tag = card_principal.find('div', class_='text-medium small font-weight-bold mb-4')
+        return {
+            'titulo': titulo_tag.text if titulo_tag else None,
+            'empresa': empresa_tag.text if empresa_tag else None,
+            'local_sal': [tag.text for tag in card_principal.find_all('div', class_='text-medium mb-4')],
+            'modalidade': modalidade_tag.text if modalidade_tag else None,
+            'painel': painel is not None,
+            'descricao': descricao_p.text if descricao_p else None,
+            'exigencias': [li.text for li in exigencias_ul.find_all('li')] if exigencias_ul else None,
+        }
+
+
+class ParserLxml:
+    """Backend lxml com expressões XPath pré-compiladas."""
+
+    nome = 'lxml'
+
+    def __init__(self):
+        xpath = lxml_etree.XPath
+        self.links = xpath('//a[@href]')
+        self.card_do_link = xpath('ancestor::div[@data-id][1]')
+        self.titulo_do_link = xpath('.//h2[@class="h3 font-weight-bold text-body mb-2"]')
+        self.cards_listagem = xpath('//div[@data-id]')
+        self.link_card = xpath('.//a[@href][contains(concat(" ", normalize-space(@class), " "), " text-decoration-none ")]')
+        self.empresa_card = xpath('.//div[@class="text-body text-medium mb-8"]')
+        self.local_card = xpath('.//div[@class="small text-medium mb-8"]')
+        self.salario_card = xpath('.//span[contains(concat(" ", normalize-space(@class), " "), " icon-money ")]/..')
+        self.modalidade_card = xpath('.//span[contains(concat(" ", normalize-space(@class), " "), " icon-location ")]/..')
+        self.card_vaga = xpath(f'//div[@class="{MARCADOR_CARD_VAGA}"]')
+        self.titulo = xpath('.//h2[contains(concat(" ", normalize-space(@class), " "), " js_vacancyHeaderTitle ")]')
+        self.empresa = xpath('.//div[contains(concat(" ", normalize-space(@class), " "), " h4 ")]')
+        self.local_sal = xpath('.//div[@class="text-medium mb-4"]')
+        self.modalidade = xpath('.//div[@class="text-medium small font-weight-bold mb-4"]')
+        self.painel = xpath('.//div[@class="pt-24 text-medium js_vacancyDataPanels js_applyVacancyHidden"]')
+        self.descricao = xpath('.//p[@class="mb-16 text-break white-space-pre-line"]')
+        self.exigencias = xpath('.//ul[contains(concat(" ", normalize-space(@class), " "), " custom-list ")]')
+
+    def candidatos_links(self, html_content):
+        raiz = lxml_html.fromstring(html_content)
+        for link_tag in self.links(raiz):
+            cards = self.card_do_link(link_tag)
+            yield (
+                link_tag.get('href'),
+                'text-decoration-none' in (link_tag.get('class') or '').split(),
+                cards[0] if cards else None,
+                bool(self.titulo_do_link(link_tag)),
+            )
+
+    def cards_busca(self, html_content):
+        def primeiro_texto(xpath, raiz):
+            encontrados = xpath(raiz)
+            return encontrados[0].text_content() if encontrados else None
+
+        cards = []
+        for card in self.cards_listagem(lxml_html.fromstring(html_content)):
+            links = self.link_card(card)
+            cards.append({
+                'href': links[0].get('href') if links else None,
+                'titulo': primeiro_texto(self.titulo_do_link, card),
+                'empresa': primeiro_texto(self.empresa_card, card),
+                'local': primeiro_texto(self.local_card, card),
+                'salario': primeiro_texto(self.salario_card, card),
+                'modalidade': primeiro_texto(self.modalidade_card, card),
+            })
+        return cards
+
+    def campos_card(self, html_content):
+        cards = self.card_vaga(lxml_html.fromstring(html_content))
+        if not cards:
+            return None
+        card_principal = cards[0]
+
+        def primeiro_texto(xpath, raiz):
+            encontrados = xpath(raiz)
+            return encontrados[0].text_content() if encontrados else None
+
+        paineis = self.painel(card_principal)
+        painel = paineis[0] if paineis else None
+        exigencias_uls = self.exigencias(painel) if painel is not None else []
+        return {
+            'titulo': primeiro_texto(self.titulo, card_principal),
+            'empresa': primeiro_texto(self.empresa, card_principal),
+            'local_sal': [tag.text_content() for tag in self.local_sal(card_principal)],
+            'modalidade': primeiro_texto(self.modalidade, card_principal),
+            'painel': painel is not None,
+            'descricao': primeiro_texto(self.descricao, painel) if painel is not None else None,
+            'exigencias': [li.text_content() for li in exigencias_uls[0].iter('li')] if exigencias_uls else None,
+        }
+
+
+class ParserSelectolax:
+    """Backend selectolax (Lexbor), o mais rápido dos três."""
+
+    nome = 'selectolax'
+
+    SELETOR_TITULO_BUSCA = 'h2[class="h3 font-weight-bold text-body mb-2"]'
+    SELETOR_CARD_VAGA = f'div[class="{MARCADOR_CARD_VAGA}"]'
+    SELETOR_PAINEL = 'div[class="pt-24 text-medium js_vacancyDataPanels js_applyVacancyHidden"]'
+
+    def candidatos_links(self, html_content):
+        arvore = SelectolaxHTMLParser(html_content)
+        for link_tag in arvore.css('a[href]'):
+            card = link_tag.parent
+            while card is not None and not (card.tag == 'div' and 'data-id' in card.attributes):
+                card = card.parent
+            yield (
+                link_tag.attributes.get('href'),
+                'text-decoration-none' in (link_tag.attributes.get('class') or '').split(),
+                card.mem_id if card is not None else None,
+                link_tag.css_first(self.SELETOR_TITULO_BUSCA) is not None,
+            )
+
+    def cards_busca(self, html_content):
+        def primeiro_texto(seletor, raiz, pai=False):
+            tag = raiz.css_first(seletor)
+            if tag is not None and pai:
+                tag = tag.parent
+            return tag.text() if tag is not None else None
+
+        cards = []
+        for card in SelectolaxHTMLParser(html_content).css('div[data-id]'):
+            link_tag = card.css_first('a.text-decoration-none[href]')
+            cards.append({
+                'href': link_tag.attributes.get('href') if link_tag is not None else None,
+                'titulo': primeiro_texto(self.SELETOR_TITULO_BUSCA, card),
+                'empresa': primeiro_texto('div[class="text-body text-medium mb-8"]', card),
+                'local': primeiro_texto('div[class="small text-medium mb-8"]', card),
+                'salario': primeiro_texto('span.icon-money', card, pai=True),
+                'modalidade': primeiro_texto('span.icon-location', card, pai=True),
+            })
+        return cards
+
+    def campos_card(self, html_content):
+        card_principal = SelectolaxHTMLParser(html_content).css_first(self.SELETOR_CARD_VAGA)
+        if card_principal is None:
+            return None
+
+        def primeiro_texto(seletor, raiz):
+            tag = raiz.css_first(seletor)
+            return tag.text() if tag is not None else None
+
+        painel = card_principal.css_first(self.SELETOR_PAINEL)
+        exigencias_ul = painel.css_first('ul.custom-list') if painel is not None else None
+        return {
+            'titulo': primeiro_texto('h2.js_vacancyHeaderTitle', card_principal),
+            'empresa': primeiro_texto('div.h4', card_principal),
+            'local_sal': [tag.text() for tag in card_principal.css('div[class="text-medium mb-4"]')],
+            'modalidade': primeiro_texto('div[class="text-medium small font-weight-bold mb-4"]', card_principal),
+            'painel': painel is not None,
+            'descricao': primeiro_texto('p[class="mb-16 text-break white-space-pre-line"]', painel) if painel is not None else None,
+            'exigencias': [li.text() for li in exigencias_ul.css('li')] if exigencias_ul is not None else None,
+        }
+
+
+BACKENDS_PARSER = {
+    'selectolax': (ParserSelectolax, lambda: SelectolaxHTMLParser is not None),
+    'lxml': (ParserLxml, lambda: lxml_html is not None),
+    'bs4': (ParserBS4, lambda: True),
+}
+
+def cria_parser_html(nome=BACKEND_PARSER):
+    """Instancia o backend de parsing pedido; 'auto' escolhe o mais rápido disponível."""
+    if nome == 'auto':
+        nome = next(n for n, (_, disponivel) in BACKENDS_PARSER.items() if disponivel())
+    classe, disponivel = BACKENDS_PARSER[nome]
+    if not disponivel():
+        raise ValueError(f"Backend de parsing '{nome}' não está instalado.")
+    return classe()
+
+parser_html = cria_parser_html(BACKEND_PARSER)
+
+class LimitadorTokenBucket:
+    """Token bucket assíncrono: libera até `taxa` requisições por segundo, com rajadas de até `capacidade`."""
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.ultimo_abastecimento = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _reabastece(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo_abastecimento) * self.taxa)
+        self.ultimo_abastecimento = agora
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                self._reabastece()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.taxa)
+
+
+def atraso_com_jitter(tentativa, base=RETRY_DELAY, teto=DISJUNTOR_PAUSA_MAXIMA):
+    """Backoff exponencial com jitter: um valor entre a metade e o total de base * 2^tentativa (limitado ao teto)."""
+    atraso = min(teto, base * (2 ** tentativa))
+    return random.uniform(atraso / 2, atraso)
+
+def segundos_retry_after(valor):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos; None se ausente ou inválido."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+        return max(0.0, data.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def motivo_bloqueio(response, marcador=None, exige_marcador=False):
+    """
+    Identifica respostas que indicam bloqueio ou limitação pelo Infojobs (None se a resposta é normal):
+    status 403/429/503, página de captcha no lugar do conteúdo esperado (`marcador`) ou, com
+    exige_marcador, qualquer página 200 sem o conteúdo esperado (ex.: página de detalhe sem o card).
+    """
+    if response.status_code in STATUS_BLOQUEIO:
+        return f"HTTP {response.status_code}"
+    if response.status_code == 200 and marcador:
+        texto = response.text
+        if marcador not in texto:
+            if PADRAO_CAPTCHA.search(texto):
+                return "página de captcha"
+            if exige_marcador:
+                return "página sem o conteúdo esperado"
+    return None
+
+class DisjuntorHost:
+    """
+    Circuit breaker com backoff adaptativo, compartilhado por todas as requisições de um host.
+    - Sinais de bloqueio (403/429/503, Retry-After, captcha, página de detalhe sem card) abrem o
+      circuito na hora: todo o tráfego para o host pausa por um backoff exponencial com jitter
+      (ou pelo Retry-After, se maior), e a taxa do token bucket do host cai pela metade.
+    - Falhas comuns (timeout, 5xx) só abrem o circuito após DISJUNTOR_LIMITE_FALHAS seguidas.
+    - Passada a pausa, uma única requisição de sonda vai na frente (meio-aberto); se ela passar,
+      o circuito fecha e cada sucesso devolve um pouco da taxa original (aumento aditivo).
+    Sinais de requisições que já estavam em voo quando o circuito abriu são ignorados (`geracao`),
+    para que uma rajada de respostas 429 não multiplique a pausa.
+    """
+
+    def __init__(self, host, limitador):
+        self.host = host
+        self.limitador = limitador
+        self.taxa_nominal = limitador.taxa
+        self.aberto_ate = 0.0
+        self.meio_aberto = False
+        self.sondando = False
+        self.bloqueios_seguidos = 0
+        self.falhas_seguidas = 0
+        self.geracao = 0
+        self._mudanca = asyncio.Event()
+
+    async def aguardar(self):
+        """Espera o circuito permitir uma requisição. Retorna a geração do circuito nesse momento."""
+        while True:
+            agora = time.monotonic()
+            if agora < self.aberto_ate:
+                self._mudanca.clear()
+                try:
+                    await asyncio.wait_for(self._mudanca.wait(), self.aberto_ate - agora)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if not self.meio_aberto:
+                return self.geracao
+            if not self.sondando:
+                self.sondando = True
+                logging.info(f" [DISJUNTOR] {self.host}: pausa encerrada, enviando requisição de sonda.")
+                return self.geracao
+            self._mudanca.clear()
+            await self._mudanca.wait()
+
+    def registra_sucesso(self, geracao):
+        self.falhas_seguidas = 0
+        if geracao != self.geracao:
+            return
+        if self.meio_aberto:
+            logging.info(f" [DISJUNTOR] {self.host}: sonda bem-sucedida, circuito fechado.")
+            self.meio_aberto = self.sondando = False
+            self.bloqueios_seguidos = 0
+            self._mudanca.set()
+        if self.limitador.taxa < self.taxa_nominal:
+            self.limitador.taxa = min(self.taxa_nominal, self.limitador.taxa + self.taxa_nominal * DISJUNTOR_PASSO_RECUPERACAO)
+
+    def registra_falha(self, geracao):
+        """Falha comum (timeout, conexão, 5xx). Muitas seguidas, ou a sonda falhando, abrem o circuito."""
+        self.falhas_seguidas += 1
+        if self.sondando and geracao == self.geracao:
+            self.registra_bloqueio(geracao, "falha na requisição de sonda")
+        elif self.falhas_seguidas >= DISJUNTOR_LIMITE_FALHAS:
+            self.registra_bloqueio(geracao, f"{self.falhas_seguidas} falhas seguidas")
+
+    def registra_bloqueio(self, geracao, motivo, retry_after=None):
+        if geracao != self.geracao:
+            return
+        metricas.incrementa('bloqueios')
+        self.geracao += 1
+        self.bloqueios_seguidos += 1
+        self.falhas_seguidas = 0
+        pausa = atraso_com_jitter(self.bloqueios_seguidos - 1, DISJUNTOR_PAUSA_BASE)
+        if retry_after is not None:
+            pausa = max(pausa, min(retry_after, DISJUNTOR_PAUSA_MAXIMA))
+        self.aberto_ate = time.monotonic() + pausa
+        self.meio_aberto = True
+        self.sondando = False
+        self.limitador._reabastece()
+        self.limitador.taxa = max(DISJUNTOR_TAXA_MINIMA, self.limitador.taxa * DISJUNTOR_FATOR_REDUCAO)
+        self.limitador.tokens = 0
+        self._mudanca.set()
+        logging.warning(
+            f" [DISJUNTOR] {self.host}: bloqueio detectado ({motivo}). Pausando o tráfego por {pausa:.1f}s; "
+            f"taxa reduzida para {self.limitador.taxa:.2f} req/s."
+        )
+
+
+class MotorScraping:
     """
-    Acessa a URL da vaga e extrai todos os detalhes. 
-    A descrição é ignorada na primeira execução (is_initial_run=True).
+    Motor assíncrono de scraping do Infojobs.
+    Usa um único pool HTTP (requests.Session) compartilhado entre buscas e páginas de detalhe,
+    limita a concorrência total e aplica um token bucket por host, de modo que a vazão
+    seja limitada pelo orçamento de polidez e não por pausas fixas.
     """
-    vaga_data = {
+
+    def __init__(self, max_concorrencia=MAX_CONCORRENCIA, taxa=REQUISICOES_POR_SEGUNDO, rajada=RAJADA_REQUISICOES,
+                 orcamento_por_minuto=ORCAMENTO_REQUISICOES_POR_MINUTO):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concorrencia, pool_maxsize=max_concorrencia)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_concorrencia, thread_name_prefix='scraper')
+        self.semaforo = asyncio.Semaphore(max_concorrencia)
+        self.taxa = self.taxa_cluster = taxa
+        self.rajada = self.rajada_cluster = rajada
+        self.orcamento_cluster = orcamento_por_minuto
+        self.fracao = 1.0
+        self.limitadores = {}
+        self.disjuntores = {}
+        self.orcamento = None
+        if orcamento_por_minuto:
+            self.orcamento = LimitadorTokenBucket(orcamento_por_minuto / 60.0, rajada)
+        self.cache_vagas = CacheVagas(self)
+        self.resumidor = ResumidorIA(self)
+
+    def limitador_para(self, url):
+        """Retorna (criando se preciso) o token bucket do host da URL."""
+        host = urlparse(url).netloc
+        if host not in self.limitadores:
+            self.limitadores[host] = LimitadorTokenBucket(self.taxa, self.rajada)
+        return self.limitadores[host]
+
+    def ajusta_fatia(self, fracao):
+        """
+        Modo worker: a taxa por host, a rajada e o orçamento por minuto valem para o cluster inteiro,
+        então cada processo usa só a sua `fracao` (1 / workers ativos). Limitadores já criados são
+        reescalados mantendo a redução que o disjuntor tenha aplicado.
+        """
+        if fracao == self.fracao:
+            return
+        escala = fracao / self.fracao
+        self.fracao = fracao
+        self.taxa = self.taxa_cluster * fracao
+        self.rajada = max(1, self.rajada_cluster * fracao)
+        limitadores = list(self.limitadores.values())
+        if self.orcamento is not None:
+            limitadores.append(self.orcamento)
+        for limitador in limitadores:
+            limitador._reabastece()
+            limitador.taxa *= escala
+            limitador.capacidade = self.rajada
+            limitador.tokens = min(limitador.tokens, limitador.capacidade)
+        for disjuntor in self.disjuntores.values():
+            disjuntor.taxa_nominal = self.taxa
+        logging.info(
+            f" [SHARDS] Fatia deste worker: {fracao:.2f} do orçamento "
+            f"({self.taxa:.2f} req/s por host, {(self.orcamento_cluster or 0) * fracao:.0f} req/min)."
+        )
+
+    async def executar(self, func, *args, **kwargs):
+        """Executa uma função bloqueante no pool de threads do motor (levando junto o contexto das métricas)."""
+        loop = asyncio.get_running_loop()
+        contexto = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(contexto.run, func, *args, **kwargs))
+
+    def fechar(self):
+        self.session.close()
+        self.executor.shutdown(wait=False)
+
+    def disjuntor_para(self, url):
+        """Retorna (criando se preciso) o circuit breaker do host da URL."""
+        host = urlparse(url).netloc
+        if host not in self.disjuntores:
+            self.disjuntores[host] = DisjuntorHost(host, self.limitador_para(url))
+        return self.disjuntores[host]
+
+    def _get(self, url, headers):
+        return self.session.get(url, headers=headers, timeout=15)
+
+    async def fetch_resposta_infojobs(self, url, headers, retries=MAX_RETRIES, marcador=None, exige_marcador=False):
+        """
+        Tenta acessar a página do Infojobs com retry, sempre passando pelo circuit breaker do host.
+        Respostas de bloqueio (ver motivo_bloqueio) pausam o host inteiro; falhas de rede e 5xx
+        esperam um backoff exponencial com jitter. Outros 4xx (ex.: 404) não são repetidos.
+        Retorna a resposta completa (status/cabeçalhos), permitindo requisições condicionais (304).
+        """
+        disjuntor = self.disjuntor_para(url)
+        for attempt in range(retries):
+            motivo = None
+            with metricas.cronometro('espera'):
+                geracao = await disjuntor.aguardar()
+                if self.orcamento is not None:
+                    await self.orcamento.adquirir()
+                await disjuntor.limitador.adquirir()
+            try:
+                async with self.semaforo:
+                    with metricas.cronometro('fetch'):
+                        response = await self.executar(self._get, url, headers)
+            except requests.RequestException as e:
+                logging.warning(f" [RETRY] Falha de conexão na tentativa {attempt + 1} para {url}: {str(e)}")
+                disjuntor.registra_falha(geracao)
+            else:
+                motivo = motivo_bloqueio(response, marcador, exige_marcador)
+                if motivo:
+                    logging.warning(f" [RETRY] Bloqueio na tentativa {attempt + 1} para {url}: {motivo}")
+                    disjuntor.registra_bloqueio(geracao, motivo, segundos_retry_after(response.headers.get('Retry-After')))
+                elif response.status_code >= 500:
+                    logging.warning(f" [RETRY] Erro do servidor na tentativa {attempt + 1} para {url}: HTTP {response.status_code}")
+                    disjuntor.registra_falha(geracao)
+                elif response.status_code >= 400:
+                    disjuntor.registra_sucesso(geracao)
+                    logging.error(f"❌ HTTP {response.status_code} para {url}. Requisição não será repetida.")
+                    return None
+                else:
+                    disjuntor.registra_sucesso(geracao)
+                    return response
+
+            if attempt < retries - 1:
+                metricas.incrementa('retries')
+                if not motivo:
+                    with metricas.cronometro('espera'):
+                        await asyncio.sleep(atraso_com_jitter(attempt))
+
+        logging.error(f"❌ Falha crítica de rede/servidor após {retries} tentativas para {url}.")
+        return None
+
+    async def fetch_page_infojobs(self, url, headers, retries=MAX_RETRIES):
+        """Tenta acessar a página do Infojobs e retorna apenas o HTML."""
+        response = await self.fetch_resposta_infojobs(url, headers, retries=retries)
+        return response.text if response is not None else None
+
+    async def fetch_pagina_condicional(self, url, headers, extrator, marcador=None):
+        """
+        Busca a página passando pelo cache persistente de respostas (cache_respostas).
+        Envia If-None-Match/If-Modified-Since quando há validadores guardados; se a página voltar
+        inalterada (304, ou o mesmo conteúdo a partir do marcador), devolve o resultado já
+        extraído sem analisar o HTML; se ele veio de outro extrator ou backend de parser, extrai
+        de novo do corpo guardado. Retorna extrator(html), ou None em falha de rede.
+        """
+        if cache_respostas is None:
+            html_content = await self.fetch_page_infojobs(url, headers, retries=MAX_RETRIES)
+            return extrator(html_content) if html_content else None
+
+        registro = cache_respostas.busca(url)
+        headers = dict(headers)
+        if registro:
+            if registro['etag']: headers['If-None-Match'] = registro['etag']
+            if registro['last_modified']: headers['If-Modified-Since'] = registro['last_modified']
+
+        response = await self.fetch_resposta_infojobs(url, headers, retries=MAX_RETRIES, marcador=marcador)
+        if response is None:
+            return None
+
+        if registro and response.status_code == 304:
+            hash_corpo = registro['hash_corpo']
+        else:
+            html_content = response.text
+            trecho = recorta_html(html_content, marcador) if marcador else html_content
+            hash_corpo = hashlib.sha256(trecho.encode('utf-8')).hexdigest()
+
+        chave_extrator = f"{extrator.__qualname__}/{parser_html.nome}"
+        if registro and hash_corpo == registro['hash_corpo']:
+            metricas.incrementa('paginas_inalteradas')
+            if response.status_code == 304:
+                cache_respostas.toca(url)
+            else:
+                cache_respostas.atualiza_validadores(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            if registro['extrator'] == chave_extrator:
+                return json.loads(registro['extraido'])
+            logging.info(f" [CACHE HTTP] Resultado de '{url}' veio de outro extrator ({registro['extrator']}). Extraindo de novo do corpo guardado.")
+            resultado = extrator(cache_respostas.corpo(url))
+            cache_respostas.atualiza_extraido(url, resultado, chave_extrator)
+            return resultado
+
+        resultado = extrator(html_content)
+        cache_respostas.salva(
+            url, html_content, hash_corpo, resultado, chave_extrator,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+        return resultado
+
+    async def coletar_links_por_termo(self, search_term, pagina=1):
+        """
+        Busca as vagas de uma página de resultados do termo, usando lógica resiliente com retry.
+        Cada vaga vem como registro parcial extraído do card da listagem ('url', título, empresa...).
+        Páginas inalteradas desde a última busca não são analisadas de novo.
+        """
+        url_busca = URL_TEMPLATE + quote_plus(search_term)
+        if pagina > 1:
+            url_busca += URL_PAGINA + str(pagina)
+        vagas = await self.fetch_pagina_condicional(
+            url_busca, HEADERS_BUSCA, parse_cards_busca, marcador=MARCADOR_RESULTADOS_BUSCA
+        )
+        return vagas or []
+
+    async def coletar_links_novos(self, search_term, limite=None):
+        """
+        Crawler incremental: percorre as páginas de resultados na ordem do site e coleta todas as
+        vagas acima da marca d'água do termo (maior vagas_id já visto) que ainda não estão salvas,
+        mesmo as listadas depois de uma vaga conhecida (vagas antigas "impulsionadas" aparecem no
+        topo). Vagas com id até a marca contam como conhecidas: ficaram de fora da população inicial
+        ou já foram arquivadas pela retenção. Só avança para a próxima página enquanto a página atual
+        não tiver nenhuma vaga conhecida, então termos parados custam uma requisição e termos
+        movimentados recuperam o atraso.
+        Retorna (registros das vagas novas em ordem, maior vagas_id entre a página 1 e a marca atual).
+        """
+        marca = repositorio.busca_marca_termo(search_term)
+        id_marca = marca['ultimo_vagas_id'] if marca else repositorio.maior_id_termo(search_term)
+        links_novos = []
+        ids_vistos = set()
+        id_mais_recente = None
+
+        for pagina in range(1, MAX_PAGINAS_BUSCA + 1):
+            links = await self.coletar_links_por_termo(search_term, pagina)
+            metricas.incrementa('links_encontrados', len(links))
+            ids = [extract_infojobs_id(link['url']) for link in links]
+            ids_conhecidos = repositorio.ids_existentes(ids, search_term)
+            if pagina == 1:
+                # A marca é a vaga mais nova (maior id), não a primeira do card: a ordem do site muda com os impulsionamentos.
+                id_mais_recente = max((i for i in (*ids, id_marca) if i and i != 'N/A'), key=int, default=None)
+
+            alcancou_conhecida = False
+            for link, vagas_id in zip(links, ids):
+                if vagas_id == 'N/A' or vagas_id in ids_vistos:
+                    continue
+                if vagas_id in ids_conhecidos or (id_marca is not None and int(vagas_id) <= int(id_marca)):
+                    alcancou_conhecida = True
+                    continue
+                ids_vistos.add(vagas_id)
+                links_novos.append(link)
+                if limite and len(links_novos) >= limite:
+                    return links_novos, id_mais_recente
+
+            if alcancou_conhecida:
+                logging.info(f"⛔ Página {pagina} de '{search_term}' já tem vagas conhecidas. Fim da paginação.")
+                break
+            if not links:
+                break
+            if pagina < MAX_PAGINAS_BUSCA:
+                logging.info(f" [PAGINAÇÃO] Página {pagina} de '{search_term}' só tem vagas novas. Seguindo para a página {pagina + 1}.")
+
+        return links_novos, id_mais_recente
+
+    async def extrair_dados_vaga_em_tempo_real(self, url, is_initial_run=False):
+        """
+        Acessa a URL da vaga e extrai todos os detalhes. 
+        A descrição não é exigida na primeira execução (is_initial_run=True).
+        Passa pelo store de vagas, então a mesma vaga é baixada uma única vez para todos os termos.
+        """
+        vagas_id = extract_infojobs_id(url)
+        if vagas_id != 'N/A':
+            return await self.cache_vagas.obter_detalhes(vagas_id, url, com_descricao=not is_initial_run)
+
+        html_content = await self.fetch_page_infojobs(url, HEADERS_DETALHE, retries=MAX_RETRIES)
+        return parse_detalhes_vaga(html_content, url, is_initial_run)
+
+
+class CacheVagas:
+    """
+    Store de vagas por vagas_id, compartilhado entre todos os termos de busca.
+    Detalhes e resumo da IA são baixados/gerados uma única vez por vaga: dentro do TTL
+    o store responde sem requisição; depois disso a vaga é revalidada com
+    If-None-Match/If-Modified-Since. Buscas simultâneas pela mesma vaga aguardam a mesma tarefa.
+    """
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.detalhes_em_andamento = {}
+        self.resumos_em_andamento = {}
+
+    async def _compartilhada(self, em_andamento, chave, fabrica):
+        tarefa = em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(fabrica())
+            em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda _: em_andamento.pop(chave, None))
+        return await asyncio.shield(tarefa)
+
+    async def obter_detalhes(self, vagas_id, url, com_descricao=True):
+        """Retorna os detalhes da vaga, usando o store sempre que ele ainda for válido."""
+        registro = repositorio.busca_vaga_cache(vagas_id)
+        completo = registro is not None and (not com_descricao or registro['descricao_completa'] is not None)
+        if completo and time.time() - registro['atualizado_em'] < TTL_CACHE_VAGA:
+            return registro
+
+        return await self._compartilhada(
+            self.detalhes_em_andamento, vagas_id,
+            lambda: self._baixa_detalhes(vagas_id, url, registro if completo else None)
+        )
+
+    async def detalhes_para_resumo(self, vagas_id, listada):
+        """
+        Detalhes de uma vaga nova, partindo do registro do card da busca. A página de detalhe só
+        é baixada quando a IA vai precisar da descrição: sem cliente Gemini, ou com o resumo já
+        guardado no store, a listagem basta. A exceção são cards em que os seletores não acharam
+        os campos essenciais (CAMPOS_ESSENCIAIS_CARD): aí a página de detalhe os completa.
+        """
+        registro = repositorio.busca_vaga_cache(vagas_id) if vagas_id != 'N/A' else None
+        if gemini_client is None or (registro and registro['resumo_ia']):
+            mesclada = mescla_listagem(listada, registro or {})
+            if not card_incompleto(mesclada):
+                return mesclada
+
+        details = await self.motor.extrair_dados_vaga_em_tempo_real(listada['url'])
+        return mescla_listagem(listada, details)
+
+    async def _baixa_detalhes(self, vagas_id, url, registro):
+        headers = dict(HEADERS_DETALHE)
+        if registro:
+            if registro['etag']: headers['If-None-Match'] = registro['etag']
+            if registro['last_modified']: headers['If-Modified-Since'] = registro['last_modified']
+
+        response = await self.motor.fetch_resposta_infojobs(
+            url, headers, retries=MAX_RETRIES, marcador=MARCADOR_CARD_VAGA, exige_marcador=True
+        )
+
+        if response is None:
+            return registro or parse_detalhes_vaga(None, url)
+
+        if response.status_code == 304 and registro:
+            repositorio.toca_vaga_cache(vagas_id)
+            return registro
+
+        details = parse_detalhes_vaga(response.text, url)
+        if details['titulo'] != 'N/A':
+            repositorio.salva_vaga_cache(
+                vagas_id, details,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+        return details
+
+    async def obter_resumo(self, vagas_id, descricao_completa, alternativa=None):
+        """
+        Retorna o resumo da IA da vaga, gerando-o apenas se ainda não existir no store.
+        Com `alternativa` (vaga abaixo do limiar de relevância), ela substitui a chamada à IA.
+        """
+        registro = repositorio.busca_vaga_cache(vagas_id)
+        if registro and registro['resumo_ia']:
+            return registro['resumo_ia']
+        if alternativa is not None:
+            return alternativa
+
+        return await self._compartilhada(
+            self.resumos_em_andamento, vagas_id,
+            lambda: self._gera_resumo(vagas_id, descricao_completa)
+        )
+
+    async def _gera_resumo(self, vagas_id, descricao_completa):
+        with metricas.cronometro('ia'):
+            resumo_ia = await self.motor.resumidor.resumir(descricao_completa)
+        # Placeholders (falha da IA, descrição ausente porque o detalhe não baixou) não são guardados:
+        # um resumo no store faz detalhes_para_resumo pular a página de detalhe para sempre.
+        if 'FALHA' not in resumo_ia and gemini_client is not None and descricao_resumivel(descricao_completa):
+            repositorio.salva_resumo_vaga(vagas_id, descricao_completa, resumo_ia)
+        return resumo_ia
+
+
+def registro_vaga_vazio(url):
+    return {
         'url': url, 'titulo': 'N/A', 'empresa': 'N/A', 'localizacao': 'N/A',
         'salario': 'N/A', 'modalidade': 'N/A', 'descricao_completa': 'N/A', 'exigencias': 'N/A',
     }
-    
-    time.sleep(1.5) 
-    
-    simple_detail_headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-    }
-    
-    html_content = fetch_page_infojobs(url, simple_detail_headers, retries=MAX_RETRIES) 
+
+@cronometrado('parse')
+def parse_cards_busca(html_content):
+    """
+    Extrai da página de busca um registro parcial por vaga (título, empresa, local, salário e
+    modalidade), sem visitar a página de detalhe. Se os cards não forem reconhecidos, usa o
+    resgate de links e devolve registros só com a URL.
+    """
+    recorte = recorta_html(html_content, MARCADOR_RESULTADOS_BUSCA)
+    registros = {}
+    for card in parser_html.cards_busca(recorte):
+        if not card['href']:
+            continue
+        registro = registro_vaga_vazio(urljoin(URL_BASE, card['href']))
+        if registro['url'] in registros:
+            continue
+        if card['titulo'] is not None: registro['titulo'] = card['titulo'].strip()
+        if card['empresa'] is not None: registro['empresa'] = ' '.join(card['empresa'].split())
+        if card['local'] is not None: registro['localizacao'] = card['local'].strip().split(',')[0].strip()
+        if card['salario'] is not None: registro['salario'] = ' '.join(card['salario'].split())
+        if card['modalidade'] is not None: registro['modalidade'] = ' '.join(card['modalidade'].split())
+        registros[registro['url']] = registro
+
+    if not registros:
+        return [registro_vaga_vazio(link) for link in escolhe_links_resgate(parser_html.candidatos_links(recorte))]
+    return list(registros.values())
+
+def card_incompleto(registro):
+    """
+    True se faltar no registro algum dos CAMPOS_ESSENCIAIS_CARD. Conta e avisa, porque é o sinal
+    de que os seletores de card deixaram de bater com o HTML do site; o chamador usa a página de detalhe.
+    """
+    faltando = [campo for campo in CAMPOS_ESSENCIAIS_CARD if registro.get(campo) in (None, 'N/A')]
+    if not faltando:
+        return False
+    metricas.incrementa('cards_incompletos')
+    logging.warning(f" [PARSER] Card de '{registro['url']}' sem {', '.join(faltando)}. Usando a página de detalhe.")
+    return True
+
+def mescla_listagem(listada, details):
+    """Completa os detalhes da vaga com os dados do card da busca nos campos que vieram vazios ('N/A')."""
+    mesclada = dict(details)
+    for campo, valor in listada.items():
+        if mesclada.get(campo) in (None, 'N/A'):
+            mesclada[campo] = valor
+    return mesclada
+
+@cronometrado('parse')
+def parse_detalhes_vaga(html_content, url, is_initial_run=False):
+    """Extrai os detalhes da vaga a partir do HTML da página de detalhe (apenas o card principal é analisado)."""
+    vaga_data = registro_vaga_vazio(url)
 
     if not html_content:
         return vaga_data
 
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        card_principal = soup.find('div', class_='card card-shadow px-32 py-20')
+        campos = parser_html.campos_card(recorta_html(html_content, MARCADOR_CARD_VAGA))
         
-        if not card_principal: return vaga_data
+        if not campos:
+            metricas.incrementa('falhas_parse')
+            return vaga_data
 
-        titulo_tag = card_principal.find('h2', class_='js_vacancyHeaderTitle')
-        vaga_data['titulo'] = titulo_tag.text.strip() if titulo_tag else 'N/A'
+        vaga_data['titulo'] = campos['titulo'].strip() if campos['titulo'] is not None else 'N/A'
         
-        empresa_tag = card_principal.find('div', class_='h4')
-        if empresa_tag: vaga_data['empresa'] = ' '.join(empresa_tag.text.split()).strip()
+        if campos['empresa'] is not None: vaga_data['empresa'] = ' '.join(campos['empresa'].split()).strip()
         
-        local_sal_tags = card_principal.find_all('div', class_='text-medium mb-4')
-        if local_sal_tags and len(local_sal_tags) > 0:
-            vaga_data['localizacao'] = local_sal_tags[0].text.strip().split(',')[0]
-        if local_sal_tags and len(local_sal_tags) > 1:
-            vaga_data['salario'] = ' '.join(local_sal_tags[1].text.split())
+        local_sal_textos = campos['local_sal']
+        if len(local_sal_textos) > 0:
+            vaga_data['localizacao'] = local_sal_textos[0].strip().split(',')[0]
+        if len(local_sal_textos) > 1:
+            vaga_data['salario'] = ' '.join(local_sal_textos[1].split())
 
-        modalidade_tag = card_principal.find('div', class_='text-medium small font-weight-bold mb-4')
-        if modalidade_tag: vaga_data['modalidade'] = modalidade_tag.text.strip().split('\n')[-1].strip()
+        if campos['modalidade'] is not None: vaga_data['modalidade'] = campos['modalidade'].strip().split('\n')[-1].strip()
 
-        if not is_initial_run: 
-            painel_detalhe = card_principal.find('div', class_='pt-24 text-medium js_vacancyDataPanels js_applyVacancyHidden')
-            
-            if painel_detalhe:
-                descricao_p = painel_detalhe.find('p', class_='mb-16 text-break white-space-pre-line')
-                if descricao_p: vaga_data['descricao_completa'] = ' '.join(descricao_p.text.split()) 
+        if not is_initial_run and campos['painel']: 
+            if campos['descricao'] is not None: vaga_data['descricao_completa'] = ' '.join(campos['descricao'].split()) 
 
-                exigencias_ul = painel_detalhe.find('ul', class_='custom-list')
-                if exigencias_ul:
-                    vaga_data['exigencias'] = ' | '.join([li.text.strip() for li in exigencias_ul.find_all('li')])
+            if campos['exigencias'] is not None:
+                vaga_data['exigencias'] = ' | '.join([li.strip() for li in campos['exigencias']])
         
     except Exception as e:
         logging.error(f" [PARSING ERROR] Falha ao processar HTML da vaga: {url}. Erro: {e}")
+        metricas.incrementa('falhas_parse')
         
     return vaga_data
 
-def run_scraper_cycle(search_term):
-    """Executa um ciclo completo de extração, salvamento e análise condicional."""
-    
-    is_initial_run = not has_data_for_term(search_term)
+def agrupa_duplicatas(search_term, novas_vagas, todos_detalhes):
+    """
+    Agrupa as vagas novas do ciclo que são quase-duplicatas (o mesmo anúncio repostado com outro
+    vagas_id, ou publicado em várias cidades), entre si ou de vagas já vistas, pela assinatura SimHash.
+    Retorna [(índices das vagas do grupo, grupo já alertado para o termo)], na ordem das vagas.
+    """
+    grupos = {}
+    indexados = set()
+    for indice, ((vagas_id, _), details) in enumerate(zip(novas_vagas, todos_detalhes)):
+        assinatura = simhash_vaga(details) if vagas_id != 'N/A' else None
+        if assinatura is None:
+            grupos[indice] = [indice]
+            continue
+
+        grupo = vagas_id
+        similar = repositorio.busca_similar(vagas_id, assinatura)
+        if similar is not None:
+            grupo = similar['grupo']
+            metricas.incrementa('duplicatas')
+            logging.info(f" [DUPLICATA] Vaga {vagas_id} ≈ vaga {similar['vagas_id']} ({similar['distancia']} bits de diferença). Grupo {grupo}.")
+        repositorio.salva_assinatura(vagas_id, assinatura, grupo)
+        grupos.setdefault(grupo, []).append(indice)
+        indexados.add(grupo)
+
+    return [
+        (membros, grupo in indexados and repositorio.grupo_ja_alertado(grupo, search_term))
+        for grupo, membros in grupos.items()
+    ]
+
+def monta_mensagem_alerta(search_term, link, details, resumo_ia, copias=(), relevancia=None):
+    """
+    Monta a mensagem HTML do alerta de nova vaga para o Telegram.
+    `copias` são (link, details) das quase-duplicatas da vaga, listadas no mesmo alerta;
+    `relevancia` é a (pontuação, palavras) do perfil do termo, quando ele existe.
+    """
+    resumo_html = build_resumo_html(resumo_ia)
+
+    escaped_search_term = safe_escape(search_term).replace('\n', ' ')
+    escaped_titulo = safe_escape(details.get('titulo', '')).replace('\n', ' ')
+    escaped_empresa = safe_escape(details.get('empresa', '')).replace('\n', ' ')
+    escaped_localizacao = safe_escape(details.get('localizacao', '')).replace('\n', ' ')
+    escaped_modalidade = safe_escape(details.get('modalidade', '')).replace('\n', ' ')
+    escaped_salario = safe_escape(details.get('salario', '')).replace('\n', ' ')
+
+    safe_link = html.escape(link, quote=True)
+
+    copias_html = ''
+    for link_copia, details_copia in copias:
+        escaped_localizacao_copia = safe_escape(details_copia.get('localizacao', '')).replace('\n', ' ')
+        copias_html += f"<b>Também em:</b> <a href=\"{html.escape(link_copia, quote=True)}\">{escaped_localizacao_copia}</a>\n"
+    if copias_html:
+        copias_html += "\n"
+
+    relevancia_html = ''
+    if relevancia is not None:
+        pontuacao, tags = relevancia
+        relevancia_html = f"<b>Perfil:</b> {pontuacao:g} pts ({safe_escape(', '.join(tags)) or 'nenhuma palavra'})\n"
+
+    return (
+        f"<b>🚨 ALERTA: NOVA VAGA ENCONTRADA (INFOJOBS)! 🚨</b>\n"
+        f"<b>Busca:</b> {escaped_search_term}\n"
+        f"<b>Vaga:</b> <a href=\"{safe_link}\">{escaped_titulo}</a>\n"
+        f"<b>Empresa:</b> {escaped_empresa}\n"
+        f"<b>Localização/Modalidade:</b> {escaped_localizacao} ({escaped_modalidade})\n"
+        f"<b>Salário:</b> {escaped_salario}\n"
+        f"{relevancia_html}\n"
+        f"{copias_html}"
+        f"<b>Resumo da IA:</b>\n{resumo_html}"
+    )
+
+async def run_scraper_cycle(motor, search_term):
+    """Executa um ciclo completo do termo, medindo cada etapa e registrando o resumo do ciclo no log."""
+    inicio_ciclo = metricas.inicia_ciclo(search_term)
+    try:
+        return await executa_ciclo_scraper(motor, search_term)
+    finally:
+        metricas.encerra_ciclo(inicio_ciclo)
+
+async def executa_ciclo_scraper(motor, search_term):
+    """
+    Executa um ciclo completo do termo como um pipeline durável (tabela pipeline_vagas):
+    descoberta -> detalhada -> resumida -> notificada -> persistida. Cada etapa drena as vagas
+    paradas no seu estado, inclusive as que sobraram de um ciclo interrompido, e grava o avanço
+    antes de a próxima começar: após uma queda, o ciclo seguinte retoma de onde parou, sem
+    baixar de novo nem repetir alertas.
+    """
     
-    global gemini_client 
+    is_initial_run = not repositorio.has_data_for_term(search_term)
     
     if is_initial_run:
-        logging.info(f" [Modo] População Inicial (IA Off, Limite={VAGAS_LIMITE_POPULACAO})")
+        logging.info(f" [Modo] População Inicial (IA Off, Limite={VAGAS_LIMITE_POPULACAO}) para '{search_term}'")
     else:
-        logging.info(" [Modo] Monitoramento Contínuo (IA On para novas vagas)")
+        logging.info(f" [Modo] Monitoramento Contínuo (IA On para novas vagas) para '{search_term}'")
 
-    logging.info(" Consultando links de vagas...")
-    vaga_links = coletar_links_por_termo(search_term)
-    logging.info(f" Encontrados {len(vaga_links)} links no total.")
+    vagas_listadas, id_mais_recente = await motor.coletar_links_novos(
+        search_term, limite=VAGAS_LIMITE_POPULACAO if is_initial_run else None
+    )
+    logging.info(f" Encontrados {len(vagas_listadas)} links novos para '{search_term}'.")
 
-    if is_initial_run and len(vaga_links) > 0:
-        limpa_vagas_por_termo(search_term) 
-    
-    vagas_processadas_count = 0
+    novas_vagas = [(extract_infojobs_id(listada['url']), listada) for listada in vagas_listadas]
+    if is_initial_run:
+        # A população inicial não resume e não alerta: vai direto para a persistência. Detalhes só para cards incompletos.
+        incompletas = [indice for indice, (_, listada) in enumerate(novas_vagas) if card_incompleto(listada)]
+        detalhes = await asyncio.gather(*(
+            motor.extrair_dados_vaga_em_tempo_real(novas_vagas[indice][1]['url'], is_initial_run=True) for indice in incompletas
+        ))
+        for indice, details in zip(incompletas, detalhes):
+            vagas_id, listada = novas_vagas[indice]
+            novas_vagas[indice] = (vagas_id, mescla_listagem(listada, details))
+        for vagas_id, _ in novas_vagas:
+            logging.info(f" [VAGA] ID: {vagas_id}. População inicial. Salvando no DB.")
+        repositorio.registra_descobertas(search_term, novas_vagas, id_mais_recente, estado='notificada')
+    else:
+        metricas.incrementa('vagas_novas', len(novas_vagas))
+        repositorio.registra_descobertas(search_term, novas_vagas, id_mais_recente)
 
-    links_a_processar = vaga_links[:VAGAS_LIMITE_POPULACAO] if is_initial_run else vaga_links
-    
-    for link in links_a_processar:
-        vagas_id = extract_infojobs_id(link)
-        
-        if vagas_id == 'N/A': continue
+    await etapa_detalhes(motor, search_term)
+    await etapa_resumos(motor, search_term)
+    etapa_notificacao(search_term)
+    vagas_processadas_count = repositorio.persiste_pipeline(search_term)
 
-        if not is_initial_run and verifica_vaga_existe(vagas_id, search_term):
-            logging.info(f"⛔ Vaga ID {vagas_id} já existe no DB para '{search_term}'. Parada imediata.")
-            return 
+    if is_initial_run and vagas_processadas_count > 0:
+        logging.info(f"✅ População Inicial concluída para '{search_term}'. {vagas_processadas_count} vagas salvas.")
+    elif vagas_processadas_count > 0:
+        logging.info(f"✅ Ciclo de monitoramento concluído para '{search_term}'. {vagas_processadas_count} novas vagas processadas.")
+    else:
+        logging.info(f"Nenhuma nova vaga encontrada neste ciclo para '{search_term}'.")
 
-        details = extrair_dados_vaga_em_tempo_real(link, is_initial_run)
-        
-        if is_initial_run:
-            resumo_ia = "[Análise de IA ignorada no modo População Inicial]"
-            logging.info(f" [VAGA] ID: {vagas_id}. População inicial. Salvando no DB.")
+    return vagas_processadas_count
+
+async def etapa_detalhes(motor, search_term):
+    """Pipeline, descoberta -> detalhada: completa o card da busca com a página de detalhe (ou o store)."""
+    pendentes = repositorio.pipeline_pendente(search_term, 'descoberta')
+    if not pendentes:
+        return
+    todos_detalhes = await asyncio.gather(
+        *(motor.cache_vagas.detalhes_para_resumo(vaga['vagas_id'], vaga['dados']) for vaga in pendentes)
+    )
+    repositorio.avanca_pipeline(search_term, 'detalhada', [
+        {'vagas_id': vaga['vagas_id'], 'dados': details} for vaga, details in zip(pendentes, todos_detalhes)
+    ])
+
+async def etapa_resumos(motor, search_term):
+    """
+    Pipeline, detalhada -> resumida: agrupa as quase-duplicatas, pontua cada vaga pelo perfil do
+    termo e gera um resumo por grupo (IA, ou o resumo automático abaixo do limiar de relevância).
+    """
+    pendentes = repositorio.pipeline_pendente(search_term, 'detalhada')
+    if not pendentes:
+        return
+    novas_vagas = [(vaga['vagas_id'], vaga['url']) for vaga in pendentes]
+    todos_detalhes = [vaga['dados'] for vaga in pendentes]
+
+    grupos = agrupa_duplicatas(search_term, novas_vagas, todos_detalhes)
+    perfil = perfis_relevancia.get(normaliza_termo(search_term))
+    relevancias = [perfil.avalia(details) if perfil else None for details in todos_detalhes]
+    alternativas = [None] * len(novas_vagas)
+    for indice, (vagas_id, _) in enumerate(novas_vagas):
+        relevancia = relevancias[indice]
+        if relevancia is not None and relevancia[0] < RELEVANCIA_LIMIAR:
+            metricas.incrementa('abaixo_do_limiar')
+            alternativas[indice] = resumo_por_modelo(todos_detalhes[indice], *relevancia)
+            logging.info(f" [VAGA NOVA] ID: {vagas_id}. Relevância {relevancia[0]:g} abaixo do limiar. IA: OFF (resumo automático).")
         else:
             logging.info(f" [VAGA NOVA] ID: {vagas_id}. IA: ON. Enviando para análise...")
-            resumo_ia = analisa_vaga_com_ia(gemini_client, details.get('descricao_completa', ''))
-            
-            logging.info(f" [VAGA NOVA] ID: {vagas_id}. IA: ON. Enviando para análise...")
-            resumo_ia = analisa_vaga_com_ia(gemini_client, details.get('descricao_completa', ''))
-            
-            resumo_html = build_resumo_html(resumo_ia)
-
-            escaped_search_term = safe_escape(search_term).replace('\n', ' ')
-            escaped_titulo = safe_escape(details.get('titulo', '')).replace('\n', ' ')
-            escaped_empresa = safe_escape(details.get('empresa', '')).replace('\n', ' ')
-            escaped_localizacao = safe_escape(details.get('localizacao', '')).replace('\n', ' ')
-            escaped_modalidade = safe_escape(details.get('modalidade', '')).replace('\n', ' ')
-            escaped_salario = safe_escape(details.get('salario', '')).replace('\n', ' ')
-
-            safe_link = html.escape(link, quote=True)
-
-            message = (
-                f"<b>🚨 ALERTA: NOVA VAGA ENCONTRADA (INFOJOBS)! 🚨</b>\n"
-                f"<b>Busca:</b> {escaped_search_term}\n"
-                f"<b>Vaga:</b> <a href=\"{safe_link}\">{escaped_titulo}</a>\n"
-                f"<b>Empresa:</b> {escaped_empresa}\n"
-                f"<b>Localização/Modalidade:</b> {escaped_localizacao} ({escaped_modalidade})\n"
-                f"<b>Salário:</b> {escaped_salario}\n\n"
-                f"<b>Resumo da IA:</b>\n{resumo_html}"
+    # Um resumo por grupo de quase-duplicatas: as cópias reaproveitam o da primeira vaga.
+    resumos_grupos = await asyncio.gather(
+        *(motor.cache_vagas.obter_resumo(
+            novas_vagas[membros[0]][0], todos_detalhes[membros[0]].get('descricao_completa', ''), alternativas[membros[0]]
+          ) for membros, _ in grupos)
+    )
+
+    repositorio.avanca_pipeline(search_term, 'resumida', [
+        {'vagas_id': novas_vagas[indice][0], 'grupo': novas_vagas[membros[0]][0], 'alertar': int(not ja_alertado),
+         'resumo_ia': resumo_ia, 'relevancia': relevancias[indice]}
+        for (membros, ja_alertado), resumo_ia in zip(grupos, resumos_grupos)
+        for indice in membros
+    ])
+
+def etapa_notificacao(search_term):
+    """
+    Pipeline, resumida -> notificada: um alerta por grupo de quase-duplicatas. O alerta entra na
+    fila do Telegram na mesma transação que marca as vagas do grupo como notificadas.
+    """
+    grupos = {}
+    for vaga in repositorio.pipeline_pendente(search_term, 'resumida'):
+        grupos.setdefault(vaga['grupo'], []).append(vaga)
+
+    for membros in grupos.values():
+        principal, copias = membros[0], membros[1:]
+        vagas_ids = [vaga['vagas_id'] for vaga in membros]
+        if not principal['alertar']:
+            logging.info(f" [DUPLICATA] Vaga {principal['vagas_id']} repete um anúncio já alertado para '{search_term}'. Alerta suprimido.")
+            repositorio.avanca_pipeline(search_term, 'notificada', [{'vagas_id': vagas_id} for vagas_id in vagas_ids])
+            continue
+
+        link, details, resumo_ia, relevancia = principal['url'], principal['dados'], principal['resumo_ia'], principal['relevancia']
+        copias = [(vaga['url'], vaga['dados']) for vaga in copias]
+        message = monta_mensagem_alerta(search_term, link, details, resumo_ia, copias, relevancia)
+        with metricas.cronometro('notify'):
+            notificador.enviar(message, search_term, vagas_ids)
+
+        print(f"\n🚨🚨 **NOVA VAGA ENCONTRADA [{search_term}]:** {details['titulo']} 🚨🚨")
+        print(f"| Link: {link}")
+        print(f"| Localização: {details.get('localizacao')}")
+        if relevancia is not None:
+            print(f"| Relevância: {relevancia[0]:g} ({', '.join(relevancia[1]) or '-'})")
+        for link_copia, details_copia in copias:
+            print(f"| Também em: {details_copia.get('localizacao')} ({link_copia})")
+        print(f"| --- RESUMO DA IA ---")
+        print(resumo_ia)
+        print(f"--------------------------------------------------")
+
+
+def normaliza_termo(search_term):
+    """Chave usada para unificar o mesmo 'role' cadastrado por clientes diferentes."""
+    return ' '.join(search_term.split()).casefold()
+
+class AgendadorTermos:
+    """
+    Agendador adaptativo por termo de busca (fila de prioridade por horário do próximo poll).
+    O intervalo base de cada termo vem da taxa de chegada de vagas observada em data_extracao:
+    termos movimentados são consultados com frequência, e cada poll sem novidade dobra o
+    intervalo (backoff exponencial) até INTERVALO_MAXIMO_TERMO. Roles repetidos entre
+    clientes viram um único poll.
+    """
+
+    def __init__(self):
+        self.fila = []
+        self.termos = {}
+
+    def atualiza_clientes(self, clients):
+        """Sincroniza os termos agendados com a tabela de clientes (novos entram já vencidos)."""
+        termos_atuais = {}
+        for _, client_name, search_term in sorted(clients):
+            if not search_term or not search_term.strip():
+                continue
+            chave = normaliza_termo(search_term)
+            if chave not in termos_atuais:
+                termos_atuais[chave] = {'search_term': search_term.strip(), 'clientes': []}
+            termos_atuais[chave]['clientes'].append(client_name)
+
+        for chave in list(self.termos):
+            if chave not in termos_atuais:
+                del self.termos[chave]
+
+        for chave, dados in termos_atuais.items():
+            if chave in self.termos:
+                self.termos[chave].update(dados)
+            else:
+                agora = time.monotonic()
+                self.termos[chave] = dict(dados, vazios=0, em_andamento=False, proximo_em=agora)
+                heapq.heappush(self.fila, (agora, chave))
+
+    def intervalo_para(self, chave):
+        """Intervalo até o próximo poll: 1/taxa de chegada, com backoff pelos polls vazios."""
+        termo = self.termos[chave]
+        taxa = repositorio.taxa_chegada(termo['search_term'], JANELA_HISTORICO_DIAS)
+        base = NOVAS_VAGAS_POR_POLL / taxa if taxa > 0 else TEMPO_ESPERA
+        intervalo = base * (2 ** termo['vazios'])
+        return min(max(intervalo, INTERVALO_MINIMO_TERMO), INTERVALO_MAXIMO_TERMO)
+
+    def segundos_ate_proximo(self):
+        while self.fila:
+            proximo_em, chave = self.fila[0]
+            termo = self.termos.get(chave)
+            if termo is None or termo['em_andamento'] or termo['proximo_em'] != proximo_em:
+                heapq.heappop(self.fila)
+                continue
+            return max(0.0, proximo_em - time.monotonic())
+        return None
+
+    def retira_proximo(self):
+        """Remove da fila o termo vencido e o marca como em andamento."""
+        _, chave = heapq.heappop(self.fila)
+        termo = self.termos[chave]
+        termo['em_andamento'] = True
+        return chave, termo['search_term'], termo['clientes']
+
+    def reagenda(self, chave, novas_vagas):
+        termo = self.termos.get(chave)
+        if termo is None:
+            return
+        termo['em_andamento'] = False
+        termo['vazios'] = 0 if novas_vagas else min(termo['vazios'] + 1, 16)
+        intervalo = self.intervalo_para(chave)
+        termo['proximo_em'] = time.monotonic() + intervalo
+        heapq.heappush(self.fila, (termo['proximo_em'], chave))
+        logging.info(f" [AGENDADOR] Próximo poll de '{termo['search_term']}' em {intervalo:.0f}s.")
+
+async def executa_termo(motor, agendador, chave, search_term, clientes):
+    """Roda o ciclo de um termo isolando falhas, para que um termo com erro não derrube os demais."""
+    logging.info(f"[CLIENTES: {', '.join(clientes)}] Buscando por: **{search_term}**")
+    novas_vagas = 0
+    try:
+        novas_vagas = await run_scraper_cycle(motor, search_term)
+    except Exception as e:
+        logging.error(f" [CLIENTES: {', '.join(clientes)}] Falha no ciclo para '{search_term}': {e}")
+    finally:
+        agendador.reagenda(chave, novas_vagas)
+
+def shard_do_termo(search_term):
+    """Shard fixo do termo (hash estável), igual em todos os processos e máquinas."""
+    return int(hashlib.sha1(normaliza_termo(search_term).encode('utf-8')).hexdigest()[:8], 16) % NUM_SHARDS
+
+def peso_rendezvous(shard, worker_id):
+    return int(hashlib.sha1(f"{shard}:{worker_id}".encode('utf-8')).hexdigest()[:16], 16)
+
+class CoordenadorShards:
+    """
+    Modo worker: vários processos (ou máquinas) dividem os termos de busca usando o mesmo banco.
+    Cada termo pertence a um shard fixo (shard_do_termo). Os shards são distribuídos entre os
+    workers ativos por hashing consistente (rendezvous), e a posse é garantida por leases na
+    tabela leases_shard: só quem tem o lease válido de um shard consulta os termos dele.
+    Se um worker morre, seus leases expiram em LEASE_TTL e os shards passam para os demais.
+    O lease especial LEASE_NOTIFICADOR define qual worker entrega a fila do Telegram.
+    """
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.leases = {}
+        self.total_ativos = 1
+
+    def shards_desejados(self, workers_ativos):
+        """Shards cujo dono preferido (maior peso rendezvous entre os ativos) é este worker."""
+        return {
+            shard for shard in [LEASE_NOTIFICADOR, *range(NUM_SHARDS)]
+            if max(workers_ativos, key=lambda worker: peso_rendezvous(shard, worker)) == self.worker_id
+        }
+
+    def sincroniza(self, shards_ocupados=()):
+        """
+        Heartbeat + rebalanceamento: renova/obtém os leases dos shards desejados e libera
+        os que passaram a pertencer a outro worker (exceto os com poll em andamento).
+        """
+        agora = time.time()
+        repositorio.registra_worker(self.worker_id, agora)
+        ativos = repositorio.workers_ativos(agora - LEASE_TTL)
+        if self.worker_id not in ativos:
+            ativos.append(self.worker_id)
+        self.total_ativos = len(ativos)
+        desejados = self.shards_desejados(ativos)
+
+        for shard in list(self.leases):
+            if shard not in desejados and shard not in shards_ocupados:
+                repositorio.libera_lease(shard, self.worker_id)
+                del self.leases[shard]
+
+        for shard in desejados | (set(shards_ocupados) & set(self.leases)):
+            if repositorio.tenta_lease(shard, self.worker_id, agora, agora + LEASE_TTL):
+                self.leases[shard] = agora + LEASE_TTL
+            else:
+                self.leases.pop(shard, None)
+
+        logging.info(f" [SHARDS] Worker '{self.worker_id}': {len(ativos)} ativos, {len(self.possuidos())} shards próprios.")
+        return self.possuidos()
+
+    def possuidos(self):
+        """Shards com lease ainda válido por pelo menos metade do TTL."""
+        limite = time.time() + LEASE_TTL / 2
+        return {shard for shard, expira_em in self.leases.items() if expira_em > limite and shard >= 0}
+
+    def responsavel_por(self, search_term):
+        return shard_do_termo(search_term) in self.possuidos()
+
+    def pode_notificar(self):
+        return self.leases.get(LEASE_NOTIFICADOR, 0) > time.time()
+
+    def libera_todos(self):
+        for shard in list(self.leases):
+            repositorio.libera_lease(shard, self.worker_id)
+        self.leases.clear()
+        repositorio.remove_worker(self.worker_id)
+
+def relatorio_shards(clients):
+    """Linhas (termo, shard, worker dono ou None, segundos até o lease expirar) para o coordenador."""
+    leases = {linha['shard']: linha for linha in repositorio.leases_validos(time.time())}
+    termos = {}
+    for _, _, search_term in clients:
+        if search_term and search_term.strip():
+            termos.setdefault(normaliza_termo(search_term), search_term.strip())
+    linhas = []
+    for search_term in sorted(termos.values()):
+        shard = shard_do_termo(search_term)
+        lease = leases.get(shard)
+        linhas.append((
+            search_term, shard,
+            lease['worker_id'] if lease else None,
+            lease['expira_em'] - time.time() if lease else None,
+        ))
+    return linhas
+
+FORMATOS_EXPORTACAO = ('csv', 'jsonl', 'parquet')
+
+def exporta_historico(destino, formato=None, busca_termo=None, dias=None, lote=EXPORTACAO_LOTE):
+    """
+    Exporta o histórico de vagas encontradas (com os campos normalizados) para CSV, JSONL ou Parquet,
+    pelo sufixo de `destino` quando `formato` não vem. Escreve bloco a bloco, com memória constante
+    qualquer que seja o tamanho da tabela; no Parquet (pacote opcional pyarrow) cada bloco vira um row
+    group. O arquivo é montado em `destino`.parcial e só o substitui no fim. Retorna as linhas exportadas.
+    """
+    formato = (formato or os.path.splitext(destino)[1].lstrip('.')).lower()
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato de exportação desconhecido: '{formato}' (use {', '.join(FORMATOS_EXPORTACAO)}).")
+    if formato == 'parquet' and pq is None:
+        raise RuntimeError("A exportação em Parquet requer o pacote pyarrow (pip install pyarrow).")
+
+    repositorio.normaliza_vagas()
+    blocos = repositorio.itera_historico(busca_termo, dias, lote)
+    temporario = destino + '.parcial'
+    total = 0
+    try:
+        if formato == 'parquet':
+            esquema = pa.schema([
+                (nome, pa.float64() if tipo == 'real' else pa.string()) for nome, tipo in RepositorioVagas.COLUNAS_EXPORTACAO
+            ])
+            with pq.ParquetWriter(temporario, esquema) as escritor:
+                for bloco in blocos:
+                    escritor.write_table(pa.Table.from_pylist(bloco, schema=esquema))
+                    total += len(bloco)
+        else:
+            with open(temporario, 'w', newline='', encoding='utf-8') as arquivo:
+                if formato == 'csv':
+                    escritor = csv.DictWriter(arquivo, fieldnames=[nome for nome, _ in RepositorioVagas.COLUNAS_EXPORTACAO])
+                    escritor.writeheader()
+                for bloco in blocos:
+                    if formato == 'csv':
+                        escritor.writerows(bloco)
+                    else:
+                        arquivo.writelines(json.dumps(linha, ensure_ascii=False) + '\n' for linha in bloco)
+                    total += len(bloco)
+        os.replace(temporario, destino)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporario)
+        raise
+    logging.info(f" [EXPORTAÇÃO] {total} vagas exportadas para '{destino}' ({formato}).")
+    return total
+
+async def monitora_clientes(coordenador=None):
+    """
+    Loop principal: dispara o poll de cada termo quando ele vence no agendador.
+    Com um coordenador (modo worker), só agenda os termos dos shards deste processo.
+    """
+    global perfis_relevancia
+    motor = MotorScraping()
+    agendador = AgendadorTermos()
+    if coordenador is not None:
+        notificador.pode_enviar = coordenador.pode_notificar
+    worker_telegram = asyncio.ensure_future(notificador.executar())
+    pendentes = repositorio.contagem_pipeline()
+    if pendentes:
+        # Sobras de um processo interrompido: o próximo ciclo de cada termo retoma cada vaga do seu estado.
+        logging.info(f" [PIPELINE] Retomando {sum(pendentes.values())} vagas pendentes: "
+                     + ', '.join(f"{estado}={total}" for estado, total in pendentes.items()))
+    tarefas = set()
+    ultima_leitura_clientes = None
+    ultima_sincronizacao = None
+    ultima_retencao = None
+    ultimos_agregados = None
+    try:
+        while True:
+            agora = time.monotonic()
+            sincronizar = coordenador is not None and (
+                ultima_sincronizacao is None or agora - ultima_sincronizacao >= LEASE_RENOVACAO
             )
+            if sincronizar:
+                ocupados = {shard_do_termo(t['search_term']) for t in agendador.termos.values() if t['em_andamento']}
+                coordenador.sincroniza(ocupados)
+                # O orçamento de polidez é do cluster: cada worker fica com a sua parte.
+                motor.ajusta_fatia(1 / coordenador.total_ativos)
+                ultima_sincronizacao = agora
 
-            send_telegram_message(message)
+            if sincronizar or ultima_leitura_clientes is None or agora - ultima_leitura_clientes >= TEMPO_ESPERA:
+                clients = fetch_clients()
+                if coordenador is not None:
+                    clients = [client for client in clients if client[2] and coordenador.responsavel_por(client[2])]
+                agendador.atualiza_clientes(clients)
+                perfis_relevancia = carrega_perfis_relevancia(clients, fetch_perfis())
+                ultima_leitura_clientes = agora
 
-            print(f"\n🚨🚨 **NOVA VAGA ENCONTRADA [{search_term}]:** {details['titulo']} 🚨🚨")
-            print(f"| Link: {link}")
-            print(f"| Localização: {details.get('localizacao')}")
-            print(f"| --- RESUMO DA IA ---")
-            print(resumo_ia)
-            print(f"--------------------------------------------------")
-            
-        registro_db = (
-            vagas_id,
-            search_term,
-            details['titulo'].strip(),
-            details['empresa'].strip(),
-            details['localizacao'].strip(),
-            details['salario'].strip(),
-            details['modalidade'].strip(),
-            link.strip(),
-            resumo_ia
-        )
-        salva_vaga_no_db(registro_db)
-        vagas_processadas_count += 1
-        
-        if is_initial_run and vagas_processadas_count >= VAGAS_LIMITE_POPULACAO:
-            logging.info(f"✅ População Inicial concluída para '{search_term}'. {vagas_processadas_count} vagas salvas.")
-            return 
+            if ultima_retencao is None or agora - ultima_retencao >= RETENCAO_INTERVALO:
+                # Com vários workers, só o dono do lease do notificador aplica a retenção.
+                if coordenador is None or coordenador.pode_notificar():
+                    tarefa = asyncio.ensure_future(motor.executar(repositorio.aplica_retencao))
+                    tarefas.add(tarefa)
+                    tarefa.add_done_callback(tarefas.discard)
+                ultima_retencao = agora
 
-    if not is_initial_run and vagas_processadas_count > 0:
-        logging.info(f"✅ Ciclo de monitoramento concluído. {vagas_processadas_count} novas vagas processadas.")
-    elif vagas_processadas_count == 0:
-        logging.info(f"Nenhuma nova vaga encontrada neste ciclo para '{search_term}'.")
+            if ultimos_agregados is None or agora - ultimos_agregados >= AGREGADOS_INTERVALO:
+                # Normalização e agregados por termo, também só no dono do lease do notificador.
+                if coordenador is None or coordenador.pode_notificar():
+                    tarefa = asyncio.ensure_future(motor.executar(repositorio.atualiza_agregados))
+                    tarefas.add(tarefa)
+                    tarefa.add_done_callback(tarefas.discard)
+                ultimos_agregados = agora
+
+            espera = agendador.segundos_ate_proximo()
+            if espera is None or espera > 0:
+                limite_espera = LEASE_RENOVACAO if coordenador is not None else TEMPO_ESPERA
+                await asyncio.sleep(min(espera if espera is not None else limite_espera, limite_espera))
+                continue
+
+            chave, search_term, clientes = agendador.retira_proximo()
+            if coordenador is not None and not coordenador.responsavel_por(search_term):
+                agendador.reagenda(chave, 0)
+                continue
+            tarefa = asyncio.ensure_future(executa_termo(motor, agendador, chave, search_term, clientes))
+            tarefas.add(tarefa)
+            tarefa.add_done_callback(tarefas.discard)
+    finally:
+        worker_telegram.cancel()
+        motor.fechar()
 
 
 if __name__ == "__main__":
-    inicializa_db_vagas() 
+    argumentos = argparse.ArgumentParser(description="Monitor de vagas do Infojobs com resumo por IA e alertas no Telegram.")
+    argumentos.add_argument('--worker', action='store_true', help="modo worker: divide os termos com outros processos via leases no banco")
+    argumentos.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}", help="identificador único deste worker")
+    argumentos.add_argument('--coordenador', action='store_true', help="mostra o shard e o worker responsável por cada termo e sai")
+    argumentos.add_argument('--consulta', action='store_true', help="lista as vagas encontradas mais recentemente (filtros: --termo, --empresa, --dias) e sai")
+    argumentos.add_argument('--termo', help="filtro da consulta/exportação/agregados: termo de busca (exato)")
+    argumentos.add_argument('--empresa', help="filtro da consulta: empresa (sem distinção de maiúsculas)")
+    argumentos.add_argument('--dias', type=float, help="filtro da consulta/exportação: só vagas encontradas nos últimos N dias")
+    argumentos.add_argument('--limite', type=int, default=50, help="máximo de vagas listadas pela consulta")
+    argumentos.add_argument('--retencao', action='store_true', help="aplica a política de retenção agora, compacta o arquivo do banco e sai")
+    argumentos.add_argument('--repopular', metavar='TERMO', help="apaga o histórico, o pipeline e a marca d'água do termo (o próximo ciclo refaz a população inicial) e sai")
+    argumentos.add_argument('--exportar', metavar='ARQUIVO', help="exporta o histórico (filtros: --termo, --dias) para CSV, JSONL ou Parquet, conforme o sufixo do ARQUIVO, e sai")
+    argumentos.add_argument('--formato', choices=FORMATOS_EXPORTACAO, help="formato da exportação, quando o sufixo do ARQUIVO não o indica")
+    argumentos.add_argument('--agregados', action='store_true', help="normaliza as vagas pendentes, recalcula os indicadores por termo, mostra-os e sai")
+    argumentos.add_argument('--metricas-porta', type=int, default=METRICAS_PORTA, help="porta local do endpoint /metrics (0 desativa)")
+    argumentos.add_argument('--perfil', metavar='ARQUIVO', help="liga o profiler por amostragem e grava as pilhas em ARQUIVO ao sair")
+    opcoes = argumentos.parse_args()
+
+    repositorio = RepositorioVagas(DB_VAGAS_NOME)
+
+    if opcoes.coordenador:
+        print(f"{'TERMO':<40}{'SHARD':>6}  {'WORKER':<30}{'LEASE (s)':>10}")
+        for search_term, shard, worker_id, restante in relatorio_shards(fetch_clients()):
+            lease = f"{restante:.0f}" if restante is not None else "-"
+            print(f"{search_term[:39]:<40}{shard:>6}  {(worker_id or 'SEM DONO')[:29]:<30}{lease:>10}")
+        repositorio.fechar()
+        raise SystemExit(0)
+
+    if opcoes.consulta:
+        print(f"{'ENCONTRADA EM (UTC)':<21}{'TERMO':<25}{'EMPRESA':<30}{'TÍTULO':<45}URL")
+        for vaga in repositorio.vagas_recentes(opcoes.termo, opcoes.empresa, opcoes.dias, opcoes.limite):
+            print(f"{vaga['data_extracao']:<21}{vaga['busca_termo'][:24]:<25}{(vaga['empresa'] or '-')[:29]:<30}"
+                  f"{(vaga['titulo'] or '-')[:44]:<45}{vaga['url_vaga'] or '-'}")
+        repositorio.fechar()
+        raise SystemExit(0)
+
+    if opcoes.exportar:
+        try:
+            exporta_historico(opcoes.exportar, opcoes.formato, opcoes.termo, opcoes.dias)
+        except (ValueError, RuntimeError) as e:
+            logging.error(f" [EXPORTAÇÃO] {e}")
+            raise SystemExit(1)
+        finally:
+            repositorio.fechar()
+        raise SystemExit(0)
+
+    if opcoes.agregados:
+        repositorio.atualiza_agregados()
+        print(f"{'TERMO':<30}{'VAGAS':>7}{'VAGAS/DIA':>11}{'SALÁRIO MEDIANO':>17}{'PRES/HÍB/REM':>15}  CIDADE")
+        for agregado in repositorio.agregados(opcoes.termo):
+            salario = f"{agregado['salario_mediano']:,.0f}" if agregado['salario_mediano'] is not None else "-"
+            modalidades = f"{agregado['presencial']}/{agregado['hibrido']}/{agregado['remoto']}"
+            print(f"{agregado['busca_termo'][:29]:<30}{agregado['vagas_janela']:>7}{agregado['vagas_por_dia']:>11.1f}"
+                  f"{salario:>17}{modalidades:>15}  {agregado['cidade_principal'] or '-'}")
+        repositorio.fechar()
+        raise SystemExit(0)
+
+    if opcoes.repopular:
+        repositorio.limpa_vagas_por_termo(opcoes.repopular)
+        repositorio.fechar()
+        raise SystemExit(0)
+
+    if opcoes.retencao:
+        repositorio.aplica_retencao()
+        repositorio.libera_espaco()
+        repositorio.fechar()
+        raise SystemExit(0)
+
+    cache_respostas = CacheRespostasHTTP(DB_RESPOSTAS_NOME)
+    notificador = NotificadorTelegram()
     
     gemini_client = None
-    if API_KEY:
+    if GEMINI_FAKE:
+         gemini_client = FakeGeminiClient()
+         logging.info(" [IA] Usando cliente Gemini local (GEMINI_FAKE).")
+    elif API_KEY:
          try:
              gemini_client = Client(api_key=API_KEY)
              logging.info(" [IA] Cliente Gemini inicializado com sucesso.")
          except Exception as e:
              logging.error(f" [IA] Falha ao inicializar o cliente Gemini: {e}. Usando Mock.")
 
-    while True:
-        try:
-            logging.info(f"\n##################################################") 
-            logging.info(f"## INICIANDO CICLO DE MONITORAMENTO DE CLIENTES ##") 
-            logging.info(f"##################################################") 
-            
-            clients = fetch_clients() 
-            
-            for client_id, client_name, search_term in clients:
-                print("\nCRITÉRIO QA: Pausa de 5 segundos antes de iniciar a busca para evitar bloqueio.")
-                time.sleep(5)
-                
-                logging.info(f"\n[CLIENTE: {client_name}] Buscando por: **{search_term}**")
-                run_scraper_cycle(search_term) 
-                time.sleep(RETRY_DELAY) 
-            
-            logging.info(f"\n💤 Todos os clientes processados. Sistema em espera por {TEMPO_ESPERA} segundos...") 
-            time.sleep(TEMPO_ESPERA)
-            
-        except KeyboardInterrupt:
-            logging.info("Execução interrompida pelo usuário.")
-            break
-        except Exception as e:
-            logging.critical(f"Falha crítica no loop principal: {e}. Reiniciando em {TEMPO_ESPERA} segundos.")
-            time.sleep(TEMPO_ESPERA)
\ No newline at end of file
+    coordenador = None
+    if opcoes.worker:
+        coordenador = CoordenadorShards(opcoes.worker_id)
+        logging.info(f" [SHARDS] Modo worker ativo como '{opcoes.worker_id}' ({NUM_SHARDS} shards).")
+
+    servidor_metricas = inicia_servidor_metricas(opcoes.metricas_porta) if opcoes.metricas_porta else None
+    perfil = AmostradorPerfil(opcoes.perfil).iniciar() if opcoes.perfil else None
+
+    try:
+        asyncio.run(monitora_clientes(coordenador))
+    except KeyboardInterrupt:
+        logging.info("Execução interrompida pelo usuário.")
+    finally:
+        if perfil is not None:
+            perfil.parar()
+        if servidor_metricas is not None:
+            servidor_metricas.shutdown()
+        if coordenador is not None:
+            coordenador.libera_todos()
+        notificador.fechar()
+        cache_respostas.fechar()
+        repositorio.fechar()
@@ -0,0 +1,136 @@
+"""
+Benchmark do ciclo completo (run_scraper_cycle) contra os servidores locais de stub_servers.py.
+
+Fluxo: cada termo recebe uma população inicial (não medida); depois o stub publica M vagas
+novas por termo e mede-se um ciclo de monitoramento de todos os termos em paralelo, até o
+último alerta sair pela fila do Telegram. Relata vagas/s, latência p50/p99 entre a descoberta
+da vaga (primeira busca que a devolveu) e o alerta, requisições por serviço e pico de RSS
+(o processo inclui o servidor stub).
+
+Uso:
+    python benchmarks/bench_ciclo.py [--termos 10] [--vagas 20] [--latencia 0.02]
+                                     [--taxa-erro 0] [--taxa-429 0] [--taxa-repost 0] [--gemini stub|fake]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import InfoJobs
+from stub_servers import ServidorStub
+
+
+def percentil(valores, p):
+    if not valores:
+        return float('nan')
+    indice = min(len(valores) - 1, max(0, round(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+async def ciclo_de_todos(motor, termos):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await asyncio.gather(*(InfoJobs.run_scraper_cycle(motor, termo) for termo in termos))
+
+
+async def aguarda_fila_telegram(timeout):
+    limite = time.monotonic() + timeout
+    while InfoJobs.repositorio.mensagens_pendentes(InfoJobs.notificador.chat_id, limite=1):
+        if time.monotonic() > limite:
+            raise TimeoutError("fila do Telegram não esvaziou dentro do tempo limite")
+        await asyncio.sleep(0.05)
+
+
+async def executa(stub, opcoes):
+    termos = [f"Termo {indice}" for indice in range(opcoes.termos)]
+    motor = InfoJobs.MotorScraping(
+        max_concorrencia=opcoes.concorrencia, taxa=opcoes.requisicoes_por_segundo,
+        rajada=opcoes.concorrencia, orcamento_por_minuto=None,
+    )
+    worker_telegram = asyncio.create_task(InfoJobs.notificador.executar())
+    try:
+        for termo in termos:
+            stub.publica(termo, InfoJobs.VAGAS_LIMITE_POPULACAO)
+        await ciclo_de_todos(motor, termos)
+
+        stub.zera_contadores()
+        InfoJobs.metricas = InfoJobs.Metricas()
+        for termo in termos:
+            stub.publica(termo, opcoes.vagas)
+
+        inicio = time.perf_counter()
+        processadas = sum(await ciclo_de_todos(motor, termos))
+        await aguarda_fila_telegram(opcoes.timeout)
+        duracao = time.perf_counter() - inicio
+    finally:
+        worker_telegram.cancel()
+        motor.fechar()
+    return processadas, duracao
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argumentos.add_argument('--termos', type=int, default=10)
+    argumentos.add_argument('--vagas', type=int, default=20, help="vagas novas por termo no ciclo medido")
+    argumentos.add_argument('--latencia', type=float, default=0.02, help="latência do Infojobs falso (s)")
+    argumentos.add_argument('--latencia-gemini', type=float, default=0.2, help="latência do Gemini falso (s)")
+    argumentos.add_argument('--taxa-erro', type=float, default=0.0, help="fração de respostas 503")
+    argumentos.add_argument('--taxa-429', type=float, default=0.0, help="fração de respostas 429")
+    argumentos.add_argument('--taxa-repost', type=float, default=0.0,
+                            help="fração de vagas novas que repetem uma vaga anterior (quase-duplicatas)")
+    argumentos.add_argument('--gemini', choices=('stub', 'fake'), default='stub',
+                            help="stub: SDK google-genai via HTTP local; fake: FakeGeminiClient em processo")
+    argumentos.add_argument('--concorrencia', type=int, default=InfoJobs.MAX_CONCORRENCIA)
+    argumentos.add_argument('--requisicoes-por-segundo', type=float, default=1000.0,
+                            help="token bucket por host (o padrão do bot, 1/s, mediria só a polidez)")
+    argumentos.add_argument('--janela-digest', type=float, default=InfoJobs.TELEGRAM_JANELA_DIGEST)
+    argumentos.add_argument('--timeout', type=float, default=600.0)
+    opcoes = argumentos.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    stub = ServidorStub(opcoes.latencia, opcoes.taxa_erro, opcoes.taxa_429,
+                        latencia_gemini=opcoes.latencia_gemini, taxa_repost=opcoes.taxa_repost, semente=42).iniciar()
+    stub.configura_infojobs()
+    InfoJobs.TELEGRAM_TOKEN = 'bench'
+    InfoJobs.TELEGRAM_CHAT_ID = 'bench'
+    InfoJobs.TELEGRAM_JANELA_DIGEST = opcoes.janela_digest
+    InfoJobs.gemini_client = stub.cliente_gemini() if opcoes.gemini == 'stub' else InfoJobs.FakeGeminiClient(opcoes.latencia_gemini)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        InfoJobs.repositorio = InfoJobs.RepositorioVagas(os.path.join(diretorio, 'vagas_bench.db'))
+        InfoJobs.cache_respostas = InfoJobs.CacheRespostasHTTP(os.path.join(diretorio, 'respostas_bench.db'))
+        InfoJobs.notificador = InfoJobs.NotificadorTelegram()
+        try:
+            processadas, duracao = asyncio.run(executa(stub, opcoes))
+        finally:
+            InfoJobs.notificador.fechar()
+            InfoJobs.cache_respostas.fechar()
+            InfoJobs.repositorio.fechar()
+            stub.parar()
+
+    latencias = stub.latencias_alerta()
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"termos={opcoes.termos} vagas/termo={opcoes.vagas} gemini={opcoes.gemini} parser={type(InfoJobs.parser_html).__name__}")
+    print(f"{'vagas processadas':<28}{processadas:>12}")
+    print(f"{'alertas entregues':<28}{len(latencias):>12}")
+    print(f"{'duração (s)':<28}{duracao:>12.2f}")
+    print(f"{'vagas/s':<28}{processadas / duracao:>12.1f}")
+    print(f"{'latência p50 (s)':<28}{percentil(latencias, 50):>12.2f}")
+    print(f"{'latência p99 (s)':<28}{percentil(latencias, 99):>12.2f}")
+    for servico, total in sorted(stub.requisicoes.items()):
+        print(f"{'requisições ' + servico:<28}{total:>12}")
+    print(f"{'pico RSS (MiB)':<28}{pico_rss:>12.1f}")
+    for etapa, (_, soma, total) in sorted(InfoJobs.metricas.histogramas.items()):
+        print(f"{'tempo ' + etapa + ' (s)':<28}{soma:>12.2f}  ({total} medições)")
+
+
+if __name__ == '__main__':
+    main()
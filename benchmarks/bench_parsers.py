@@ -0,0 +1,84 @@
+"""
+Benchmark dos backends de parsing sobre as fixtures de benchmarks/fixtures.
+
+As fixtures são SINTÉTICAS: marcação inventada no formato das páginas do Infojobs, não páginas
+gravadas do site. Os números servem para comparar os backends entre si, não como medida do
+desempenho em páginas reais.
+
+Para cada backend instalado mede páginas por segundo e pico de memória (tracemalloc) na
+extração dos registros dos cards da busca (parse_cards_busca, o caminho usado pelo crawler)
+e dos detalhes da vaga. A linha 'bs4-html.parser' usa o parser do caminho antigo
+(BeautifulSoup com html.parser) e serve de referência.
+
+Uso:
+    python benchmarks/bench_parsers.py [--repeticoes 200]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import InfoJobs
+
+DIR_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def carrega_fixtures(prefixo):
+    paginas = []
+    for nome in sorted(os.listdir(DIR_FIXTURES)):
+        if nome.startswith(prefixo) and nome.endswith('.html'):
+            with open(os.path.join(DIR_FIXTURES, nome), encoding='utf-8') as arquivo:
+                paginas.append(arquivo.read())
+    return paginas
+
+
+def backends_disponiveis():
+    backends = [('bs4-html.parser', InfoJobs.ParserBS4('html.parser'))]
+    for nome, (_, disponivel) in InfoJobs.BACKENDS_PARSER.items():
+        if disponivel():
+            backends.append((nome, InfoJobs.cria_parser_html(nome)))
+    return backends
+
+
+def mede(funcao, paginas, repeticoes):
+    """Retorna (páginas por segundo, pico de memória em KiB) de `funcao` sobre as páginas."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for pagina in paginas:
+            funcao(pagina)
+    duracao = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    for pagina in paginas:
+        funcao(pagina)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return repeticoes * len(paginas) / duracao, pico / 1024
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argumentos.add_argument('--repeticoes', type=int, default=200)
+    opcoes = argumentos.parse_args()
+
+    buscas = carrega_fixtures('busca_')
+    detalhes = carrega_fixtures('vaga_')
+
+    print(f"{'backend':<18}{'etapa':<10}{'páginas/s':>12}{'pico (KiB)':>14}")
+    for nome, parser in backends_disponiveis():
+        InfoJobs.parser_html = parser
+        etapas = (
+            ('cards', InfoJobs.parse_cards_busca, buscas),
+            ('detalhe', lambda pagina: InfoJobs.parse_detalhes_vaga(pagina, 'fixture'), detalhes),
+        )
+        for etapa, funcao, paginas in etapas:
+            paginas_por_segundo, pico = mede(funcao, paginas, opcoes.repeticoes)
+            print(f"{nome:<18}{etapa:<10}{paginas_por_segundo:>12.1f}{pico:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
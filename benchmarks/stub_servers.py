@@ -0,0 +1,348 @@
+"""
+Servidores locais que imitam o Infojobs, a API do Telegram e a API do Gemini, para rodar
+o pipeline completo offline (benchmarks e testes manuais).
+
+- Infojobs: busca (/empregos.aspx?palabra=...&page=N) e detalhe (/vaga-de-...__ID.aspx),
+  montados a partir das fixtures sintéticas de benchmarks/fixtures com IDs e descrições únicos
+  (ou, com taxa_repost, copiados de uma vaga anterior do termo: reposts/quase-duplicatas).
+  A busca envia ETag e responde 304 a If-None-Match quando a página não mudou.
+- Telegram: POST /bot<token>/sendMessage responde {"ok": true}.
+- Gemini: POST .../models/<modelo>:generateContent responde no formato da API REST,
+  com o texto gerado pelo FakeGeminiClient do InfoJobs.
+
+Latência, taxa de erros 5xx, taxa de 429 (com Retry-After) e taxa de páginas de captcha são
+configuráveis; bloqueia_por(s) simula um bloqueio total do Infojobs por alguns segundos. O servidor
+também registra quando cada vaga foi publicada, descoberta (primeira busca que a devolveu)
+e alertada (primeira mensagem do Telegram que a citou).
+
+Uso avulso:
+    python benchmarks/stub_servers.py [--porta 8080] [--termos 5] [--vagas 40] [--latencia 0.05]
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import InfoJobs
+
+DIR_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+MARCADOR_CARD = '<div class="card card-shadow card-shadow-hover text-break mb-16 grid-row js_rowCard"'
+ID_CARD = re.compile(r'data-id="(\d+)"')
+LINK_CARD = re.compile(r'href="(/vaga-de-[^"]*?)__\d+\.aspx"')
+TITULO_CARD = re.compile(r'(<h2 class="h3 font-weight-bold text-body mb-2">)[^<]*(</h2>)')
+TITULO_DETALHE = re.compile(r'(js_vacancyHeaderTitle">)[^<]*(</h2>)')
+DESCRICAO_DETALHE = re.compile(r'(<p class="mb-16 text-break white-space-pre-line">)([^<]*)')
+ID_VAGA = re.compile(r'__(\d+)\.aspx')
+
+
+def carrega_fixture(nome):
+    with open(os.path.join(DIR_FIXTURES, nome), encoding='utf-8') as arquivo:
+        return arquivo.read()
+
+
+class PaginasInfojobs:
+    """Gera páginas de busca e de detalhe a partir das fixtures sintéticas."""
+
+    def __init__(self):
+        busca = carrega_fixture('busca_recepcionista.html')
+        inicio = busca.index(MARCADOR_CARD)
+        fim = busca.rindex(MARCADOR_CARD)
+        fim = busca.index('\n</div>\n', fim) + len('\n</div>\n')
+        self.prefixo_busca = busca[:inicio]
+        self.sufixo_busca = busca[fim:]
+        self.card = busca[inicio:busca.index(MARCADOR_CARD, inicio + 1)]
+        self.detalhe = carrega_fixture('vaga_detalhe.html')
+        self.vocabulario = sorted(set(re.findall(r'\w+', DESCRICAO_DETALHE.search(self.detalhe).group(2).lower())))
+
+    def descricao(self, semente, unidade=None):
+        """
+        Descrição pseudoaleatória, sempre a mesma para a mesma semente, no estilo da fixture.
+        Um repost acrescenta a linha da unidade: quase igual à original, mas com outro hash.
+        """
+        aleatorio = random.Random(semente)
+        frases = [' '.join(aleatorio.choice(self.vocabulario) for _ in range(20)).capitalize() + '.' for _ in range(8)]
+        if unidade is not None:
+            frases.append(f"Vaga aberta na unidade {unidade}.")
+        return '\n'.join(frases)
+
+    def busca(self, vagas):
+        """vagas: lista de (vagas_id, titulo) na ordem do site."""
+        cards = []
+        for vagas_id, titulo in vagas:
+            card = ID_CARD.sub(f'data-id="{vagas_id}"', self.card, count=1)
+            card = LINK_CARD.sub(lambda m: f'href="{m.group(1)}__{vagas_id}.aspx"', card, count=1)
+            card = TITULO_CARD.sub(lambda m: m.group(1) + titulo + m.group(2), card, count=1)
+            cards.append(card)
+        return self.prefixo_busca + ''.join(cards) + self.sufixo_busca
+
+    def vaga(self, titulo, semente, unidade=None):
+        pagina = TITULO_DETALHE.sub(lambda m: m.group(1) + titulo + m.group(2), self.detalhe, count=1)
+        # Descrição própria por vaga, para que o cache de resumos e a detecção de quase-duplicatas
+        # não escondam o custo da IA (só os reposts compartilham a semente).
+        return DESCRICAO_DETALHE.sub(lambda m: m.group(1) + self.descricao(semente, unidade), pagina, count=1)
+
+
+class ServidorStub:
+    """
+    Servidor HTTP local (thread própria) com as três APIs falsas.
+    `publica(termo, n)` coloca n vagas novas no topo da busca do termo; uma fração `taxa_repost`
+    delas repete título e descrição de outra vaga do termo, com vagas_id novo.
+    """
+
+    def __init__(self, latencia=0.0, taxa_erro=0.0, taxa_429=0.0, retry_after=1, por_pagina=20,
+                 latencia_gemini=0.0, validadores=True, taxa_captcha=0.0, taxa_repost=0.0, porta=0, semente=None):
+        self.latencia = latencia
+        self.taxa_captcha = taxa_captcha
+        self.taxa_repost = taxa_repost
+        self.bloqueado_ate = 0.0
+        self.validadores = validadores
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.por_pagina = por_pagina
+        self.latencia_gemini = latencia_gemini
+        self.aleatorio = random.Random(semente)
+        self.paginas = PaginasInfojobs()
+        self.gemini = InfoJobs.FakeGeminiClient()
+        self.trava = threading.Lock()
+        self.vagas_por_termo = {}
+        self.titulos = {}
+        self.sementes_descricao = {}
+        self.publicada_em = {}
+        self.descoberta_em = {}
+        self.alertada_em = {}
+        self.requisicoes = Counter()
+        self.proximo_id = 50000000
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._cria_handler())
+        self.servidor.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_port}"
+
+    def iniciar(self):
+        self.thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def configura_infojobs(self):
+        """Aponta as URLs do InfoJobs (Infojobs, Telegram e Gemini) para este servidor."""
+        InfoJobs.URL_BASE = self.url
+        InfoJobs.URL_TEMPLATE = self.url + "/empregos.aspx?palabra="
+        InfoJobs.TELEGRAM_API_BASE = self.url
+
+    def cliente_gemini(self):
+        """Cliente google-genai real, apontado para o endpoint Gemini deste servidor."""
+        from google.genai import types
+        return InfoJobs.Client(api_key='stub', http_options=types.HttpOptions(base_url=self.url))
+
+    def publica(self, termo, quantidade):
+        """Publica `quantidade` vagas novas para o termo e retorna seus IDs."""
+        chave = InfoJobs.normaliza_termo(termo)
+        agora = time.monotonic()
+        with self.trava:
+            novas = []
+            for _ in range(quantidade):
+                vagas_id = str(self.proximo_id)
+                self.proximo_id += 1
+                anteriores = novas + self.vagas_por_termo.get(chave, [])
+                if anteriores and self.aleatorio.random() < self.taxa_repost:
+                    original = self.aleatorio.choice(anteriores)
+                    self.titulos[vagas_id] = self.titulos[original]
+                    self.sementes_descricao[vagas_id] = (self.sementes_descricao[original][0], vagas_id)
+                else:
+                    self.titulos[vagas_id] = f"{termo.title()} {vagas_id}"
+                    self.sementes_descricao[vagas_id] = (vagas_id, None)
+                self.publicada_em[vagas_id] = agora
+                novas.append(vagas_id)
+            self.vagas_por_termo[chave] = novas[::-1] + self.vagas_por_termo.get(chave, [])
+        return novas
+
+    def zera_contadores(self):
+        with self.trava:
+            self.requisicoes.clear()
+            self.descoberta_em.clear()
+            self.alertada_em.clear()
+
+    def latencias_alerta(self):
+        """Latência (s) entre a descoberta de cada vaga e o primeiro alerta que a citou."""
+        with self.trava:
+            return sorted(
+                self.alertada_em[vagas_id] - self.descoberta_em[vagas_id]
+                for vagas_id in self.alertada_em if vagas_id in self.descoberta_em
+            )
+
+    def bloqueia_por(self, segundos):
+        """Simula um bloqueio do Infojobs: todas as requisições recebem 429 durante `segundos`."""
+        self.bloqueado_ate = time.monotonic() + segundos
+
+    def _falha_simulada(self, servico):
+        """Sorteia uma falha para a requisição: None, 429, 503 ou (só no Infojobs) 'captcha'."""
+        if servico == 'infojobs' and time.monotonic() < self.bloqueado_ate:
+            self.requisicoes[f'{servico}_429'] += 1
+            return 429
+        sorteio = self.aleatorio.random()
+        if servico == 'infojobs' and sorteio < self.taxa_captcha:
+            self.requisicoes['infojobs_captcha'] += 1
+            return 'captcha'
+        sorteio -= self.taxa_captcha if servico == 'infojobs' else 0.0
+        if sorteio < self.taxa_429:
+            self.requisicoes[f'{servico}_429'] += 1
+            return 429
+        if sorteio < self.taxa_429 + self.taxa_erro:
+            self.requisicoes[f'{servico}_erro'] += 1
+            return 503
+        return None
+
+    def _pagina_busca(self, consulta):
+        termo = consulta.get('palabra', [''])[0]
+        pagina = int(consulta.get('page', ['1'])[0])
+        agora = time.monotonic()
+        with self.trava:
+            ids = self.vagas_por_termo.get(InfoJobs.normaliza_termo(termo), [])
+            ids = ids[(pagina - 1) * self.por_pagina:pagina * self.por_pagina]
+            for vagas_id in ids:
+                self.descoberta_em.setdefault(vagas_id, agora)
+            vagas = [(vagas_id, self.titulos[vagas_id]) for vagas_id in ids]
+        etag = '"' + hashlib.sha1(','.join(ids).encode('ascii')).hexdigest() + '"'
+        return self.paginas.busca(vagas), etag
+
+    def _registra_alerta(self, corpo):
+        agora = time.monotonic()
+        with self.trava:
+            for vagas_id in ID_VAGA.findall(corpo):
+                self.alertada_em.setdefault(vagas_id, agora)
+
+    def _resposta_gemini(self, corpo):
+        pedido = json.loads(corpo or '{}')
+        textos = [parte.get('text', '') for conteudo in pedido.get('contents', []) for parte in conteudo.get('parts', [])]
+        texto = self.gemini.generate_content('stub', textos or ['']).text
+        return {
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': texto}]}, 'finishReason': 'STOP', 'index': 0}],
+            'usageMetadata': {'promptTokenCount': 0, 'candidatesTokenCount': 0, 'totalTokenCount': 0},
+        }
+
+    def _cria_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _responde(self, status, corpo, tipo='text/html; charset=utf-8', cabecalhos=None):
+                dados = corpo.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(dados)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _responde_falha(self, status, servico):
+                if status == 'captcha':
+                    return self._responde(200, '<html><body><div class="g-recaptcha"></div>Confirme que você não é um robô.</body></html>')
+                if servico == 'telegram' and status == 429:
+                    corpo = json.dumps({'ok': False, 'error_code': 429, 'parameters': {'retry_after': stub.retry_after}})
+                    return self._responde(429, corpo, 'application/json')
+                self._responde(status, 'stub: falha simulada', 'text/plain', {'Retry-After': str(stub.retry_after)})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if stub.latencia:
+                    time.sleep(stub.latencia)
+                falha = stub._falha_simulada('infojobs')
+                if falha:
+                    return self._responde_falha(falha, 'infojobs')
+
+                encontrado = ID_VAGA.search(url.path)
+                if encontrado:
+                    vagas_id = encontrado.group(1)
+                    stub.requisicoes['detalhe'] += 1
+                    if vagas_id not in stub.titulos:
+                        return self._responde(404, 'vaga não encontrada', 'text/plain')
+                    return self._responde(200, stub.paginas.vaga(stub.titulos[vagas_id], *stub.sementes_descricao[vagas_id]))
+
+                if url.path.endswith('/empregos.aspx'):
+                    stub.requisicoes['busca'] += 1
+                    pagina, etag = stub._pagina_busca(parse_qs(url.query))
+                    if not stub.validadores:
+                        return self._responde(200, pagina)
+                    if self.headers.get('If-None-Match') == etag:
+                        stub.requisicoes['busca_304'] += 1
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    return self._responde(200, pagina, cabecalhos={'ETag': etag})
+
+                self._responde(404, 'rota desconhecida', 'text/plain')
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                corpo = self.rfile.read(tamanho).decode('utf-8', errors='replace')
+
+                if url.path.endswith('/sendMessage'):
+                    falha = stub._falha_simulada('telegram')
+                    if falha:
+                        return self._responde_falha(falha, 'telegram')
+                    stub.requisicoes['telegram'] += 1
+                    stub._registra_alerta(parse_qs(corpo).get('text', [corpo])[0])
+                    return self._responde(200, json.dumps({'ok': True, 'result': {}}), 'application/json')
+
+                if url.path.endswith(':generateContent'):
+                    if stub.latencia_gemini:
+                        time.sleep(stub.latencia_gemini)
+                    falha = stub._falha_simulada('gemini')
+                    if falha:
+                        return self._responde_falha(falha, 'gemini')
+                    stub.requisicoes['gemini'] += 1
+                    return self._responde(200, json.dumps(stub._resposta_gemini(corpo)), 'application/json')
+
+                self._responde(404, 'rota desconhecida', 'text/plain')
+
+        return Handler
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argumentos.add_argument('--porta', type=int, default=8080)
+    argumentos.add_argument('--termos', type=int, default=5, help="termos com vagas publicadas (termo-0, termo-1, ...)")
+    argumentos.add_argument('--vagas', type=int, default=40, help="vagas publicadas por termo")
+    argumentos.add_argument('--latencia', type=float, default=0.0)
+    argumentos.add_argument('--taxa-erro', type=float, default=0.0)
+    argumentos.add_argument('--taxa-429', type=float, default=0.0)
+    opcoes = argumentos.parse_args()
+
+    stub = ServidorStub(opcoes.latencia, opcoes.taxa_erro, opcoes.taxa_429, porta=opcoes.porta).iniciar()
+    for indice in range(opcoes.termos):
+        stub.publica(f"termo-{indice}", opcoes.vagas)
+    print(f"Stub ouvindo em {stub.url} (Infojobs, Telegram e Gemini). Ctrl+C para sair.")
+    try:
+        stub.thread.join()
+    except KeyboardInterrupt:
+        stub.parar()
+
+
+if __name__ == '__main__':
+    main()